@@ -1,65 +1,41 @@
 """Fire Alarm PDF Analyzer - Main Application"""
-# --- PyTorch 2.6 Compatibility Patch (global) ---
-import torch
-from torch import serialization as _serialization
-
-# Force-disable weights_only (trusted local checkpoint)
-__orig_load = torch.load
-def _safe_load_override(*args, **kwargs):
-    kwargs["weights_only"] = False
-    return __orig_load(*args, **kwargs)
-torch.load = _safe_load_override
-_serialization.load = _safe_load_override
-# --- End Patch ---
-
-# --- Ultralytics DFLoss shim for older checkpoints ---
-import torch.nn as nn
-try:
-    import ultralytics.utils.loss as yloss
-    if not hasattr(yloss, "DFLoss"):
-        class DFLoss(nn.Module):
-            def __init__(self, *args, **kwargs): super().__init__()
-            def forward(self, *args, **kwargs):
-                raise RuntimeError("DFLoss shim was called during inference (should not happen).")
-        yloss.DFLoss = DFLoss
-except Exception:
-    # If ultralytics isn't imported yet, we'll set the shim later in local_yolo_detector too.
-    pass
-# --- End Shim ---
-
-
-# --- PyTorch 2.6 Compatibility Patch ---
-import torch
-from torch import serialization
-
-# Monkey-patch torch.load to force full model deserialization
-_original_torch_load = torch.load
-
-def _safe_load_override(*args, **kwargs):
-    # Force-disable weights_only protection — trusted local checkpoint
-    kwargs["weights_only"] = False
-    return _original_torch_load(*args, **kwargs)
-
-torch.load = _safe_load_override
-serialization.load = _safe_load_override
-# --- End Patch ---
-
+import json
 import logging
 import os
+import runpy
 import sys
+import threading
 
 from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import config
-from modules import (
+
+# Cap BLAS/OpenMP pools before numpy or torch are imported so worker
+# processes do not oversubscribe the CPU.
+for _thread_var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(_thread_var, str(config.THREADS_PER_WORKER))
+
+# Have torch.cuda.is_available() ask NVML, so choosing the detector device in
+# the gunicorn master does not initialize CUDA before workers fork.
+os.environ.setdefault("PYTORCH_NVML_BASED_CUDA_CHECK", "1")
+
+from modules import (  # noqa: E402
     DetectionVisualizer,
     GeminiAnalyzer,
     LOCAL_YOLO_IMPORT_ERROR,
     LocalYOLODetector,
     PDFProcessor,
+    ResultCache,
+    TileBatcher,
 )
 
 
@@ -70,25 +46,61 @@ logging.basicConfig(level=config.LOG_LEVEL, format=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
 
-# =============================================================================
-# FLASK APP INITIALIZATION
-# =============================================================================
-app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Serialize responses with orjson (numpy scalars/arrays included)."""
+
+    _OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 
 class FireAlarmAnalyzer:
     """Main analyzer class that coordinates all components."""
 
     def __init__(self):
-        self.pdf_processor = PDFProcessor(dpi=config.DPI)
+        self.result_cache = ResultCache()
+        self.pdf_processor = PDFProcessor(dpi=config.DPI, render_workers=config.MAX_WORKERS)
+        self.pdf_processor.cache = self.result_cache
         self.local_detector = None
         self.local_detector_error: str | None = None
+        self.batcher: TileBatcher | None = None
         self.gemini_analyzer = GeminiAnalyzer()
+        # Share the cached processor so repeat analyses reuse extracted text
+        self.gemini_analyzer.pdf_processor = self.pdf_processor
         self.visualizer = DetectionVisualizer()
-
-        # Initialize local detector if model available
-        self._initialize_local_detector()
+        # True while a CUDA detector waits to be loaded by ensure_local_detector()
+        self.local_detector_pending = False
+        self._detector_lock = threading.Lock()
+
+        # Initialize local detector if model available. CUDA cannot be used
+        # across fork(), so a CUDA model is left for each worker to load.
+        if self._detector_device().startswith("cuda"):
+            self.local_detector_pending = True
+            logger.info("Local detector uses CUDA; deferring load to the serving process")
+        else:
+            self._initialize_local_detector()
+
+    def ensure_local_detector(self) -> None:
+        """Load a detector deferred by the constructor (call after forking)."""
+        with self._detector_lock:
+            if self.local_detector_pending:
+                self.local_detector_pending = False
+                self._initialize_local_detector()
+
+    @staticmethod
+    def _detector_device() -> str:
+        """Device the detector would use, without initializing CUDA."""
+        if LocalYOLODetector is None:
+            return "cpu"
+        try:
+            return LocalYOLODetector.select_device()
+        except Exception:  # pragma: no cover - load errors are reported by _initialize_local_detector
+            return "cpu"
 
     def _initialize_local_detector(self) -> None:
         """Initialize local detection model if available."""
@@ -131,19 +143,43 @@ class FireAlarmAnalyzer:
             logger.error("❌ %s", self.local_detector_error, exc_info=True)
             return
 
+        try:
+            self.local_detector.warmup(shapes=[
+                (1, 3, config.TILE_SIZE, config.TILE_SIZE),
+                (config.TILE_BATCH_SIZE, 3, config.TILE_SIZE, config.TILE_SIZE),
+            ])
+        except Exception as exc:  # pragma: no cover - warmup is best effort
+            logger.warning("Local detector warmup failed: %s", exc, exc_info=True)
+
+        # Route tile inference through a shared batcher so concurrent requests
+        # share forward passes instead of running one tile at a time.
+        self.batcher = TileBatcher(self.local_detector)
+        self.local_detector.batcher = self.batcher
+
         logger.info("✅ Local detector initialized successfully!")
         self.local_detector_error = None
 
-# Create global analyzer instance
-analyzer = FireAlarmAnalyzer()
-
 
 # =============================================================================
-# REGISTER ROUTES
+# FLASK APP FACTORY
 # =============================================================================
-from routes import register_routes  # noqa: E402
+def create_app() -> Flask:
+    """Create the Flask app and load the analyzer models.
+
+    Nothing heavy runs at import time; gunicorn calls this once in the master
+    (``app:create_app()`` with ``preload_app``) so workers share CPU weights.
+    A CUDA detector is loaded per worker by gunicorn's ``post_fork`` hook.
+    """
+    from routes import register_routes
+
+    app = Flask(__name__)
+    app.config['MAX_CONTENT_LENGTH'] = config.MAX_CONTENT_LENGTH
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
 
-register_routes(app, analyzer)
+    app.analyzer = FireAlarmAnalyzer()
+    register_routes(app, app.analyzer)
+    return app
 
 
 # =============================================================================
@@ -151,9 +187,8 @@ register_routes(app, analyzer)
 # =============================================================================
 def main() -> None:
     """Main application entry point."""
-    print("\n" + "=" * 70)
-    print("🚨 FIRE ALARM PDF ANALYZER - v6 (NEW GEMINI MODULE)")
-    print("=" * 70)
+    app = create_app()
+    analyzer = app.analyzer
 
     # Validate configuration (assuming this function exists in config.py)
     try:
@@ -163,29 +198,69 @@ def main() -> None:
     except Exception as exc:  # pragma: no cover - validation errors are logged
         logger.error("Error during config validation: %s", exc)
 
-    logger.info("\n🤖 Analyzer Status:")
-    detector_status = '✅ INITIALIZED' if analyzer.local_detector else '❌ NOT INITIALIZED'
+    if analyzer.local_detector_pending:
+        detector_status = '⏳ LOADS IN EACH WORKER (CUDA)'
+    else:
+        detector_status = '✅ INITIALIZED' if analyzer.local_detector else '❌ NOT INITIALIZED'
     gemini_status = '✅ CONFIGURED' if analyzer.gemini_analyzer.is_available() else '⚪ NOT CONFIGURED'
+    ready_line = (
+        "✅ All systems ready!" if analyzer.local_detector or analyzer.local_detector_pending
+        else "⚠️  WARNING: Local detector is not initialized! Detection will be disabled."
+    )
+
+    banner = "\n".join([
+        "",
+        "=" * 70,
+        "🚨 FIRE ALARM PDF ANALYZER - v6 (NEW GEMINI MODULE)",
+        "=" * 70,
+        "🤖 Analyzer Status:",
+        f"  Local Detector: {detector_status}",
+        f"  Gemini AI: {gemini_status}",
+        ready_line,
+        "=" * 70,
+        f"🌐 Open your browser to: http://localhost:{config.PORT}",
+        "=" * 70,
+        "",
+    ])
+    sys.stdout.write(banner)
+    sys.stdout.flush()
 
-    logger.info("  Local Detector: %s", detector_status)
     if not analyzer.local_detector and analyzer.local_detector_error:
-        logger.error("  Local Detector Error: %s", analyzer.local_detector_error)
+        logger.error("Local Detector Error: %s", analyzer.local_detector_error)
 
-    logger.info("  Gemini AI: %s", gemini_status)
+    model_found = bool(getattr(config, 'LOCAL_MODEL_FOUND', False))
+    logger.info("startup_status %s", json.dumps({
+        'local_detector': bool(analyzer.local_detector),
+        'gemini': analyzer.gemini_analyzer.is_available(),
+        'model_path': config.LOCAL_MODEL_PATH,
+        'model_sha256': config.model_sha256() if model_found else None,
+    }))
 
-    if analyzer.local_detector:
-        logger.info("\n✅ All systems ready!")
-    else:
-        logger.error(
-            "⚠️  WARNING: Local detector is not initialized! Detection will be disabled."
-        )
+    _serve(app)
 
-    print("=" * 70)
-    print(f"🌐 Open your browser to: http://localhost:{config.PORT}")
-    print("=" * 70 + "\n")
 
-    # Run Flask app
-    app.run(host='0.0.0.0', port=config.PORT, debug=False)
+def _serve(app: Flask) -> None:
+    """Serve the already-initialized app with gunicorn, or Flask as a fallback."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn is unavailable on Windows; use Flask's threaded server instead.
+        logger.warning("gunicorn not installed. Falling back to the Flask development server.")
+        app.analyzer.ensure_local_detector()
+        app.run(host='0.0.0.0', port=config.PORT, debug=False, threaded=True)
+        return
+
+    class _GunicornApplication(BaseApplication):
+        def load_config(self):
+            conf_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+            for key, value in runpy.run_path(conf_path).items():
+                if key in self.cfg.settings and value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    _GunicornApplication().run()
 
 
 if __name__ == "__main__":
@@ -2,8 +2,10 @@
 
 from __future__ import annotations
 
+import hashlib
 import logging
 import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, List, Tuple
 
@@ -55,8 +57,9 @@ def _iter_env_candidates(env_path: str, cwd: Path) -> Iterable[Path]:
         yield _ensure_absolute(candidate, cwd)
 
 
+@lru_cache(maxsize=1)
 def _collect_candidate_paths() -> Tuple[str, bool, List[str]]:
-    """Determine the most appropriate local model path and search order."""
+    """Determine the most appropriate local model path and search order (resolved once)."""
 
     cwd = Path.cwd()
     raw_env_path = os.environ.get("LOCAL_MODEL_PATH")
@@ -101,27 +104,110 @@ def _collect_candidate_paths() -> Tuple[str, bool, List[str]]:
 
 LOCAL_MODEL_PATH, LOCAL_MODEL_FOUND, LOCAL_MODEL_SEARCH_PATHS = _collect_candidate_paths()
 
+
+@lru_cache(maxsize=8)
+def _file_sha256(path: str, mtime_ns: int, size: int) -> str:
+    """Hash a file once per (path, mtime, size) version."""
+
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def model_sha256(path: str | None = None) -> str:
+    """Return the SHA-256 of the model weights, hashing each file version only once."""
+
+    path = os.path.abspath(path or LOCAL_MODEL_PATH)
+    stat = os.stat(path)
+    return _file_sha256(path, stat.st_mtime_ns, stat.st_size)
+
+# Accelerated backend the checkpoint is exported to at startup:
+# "auto" (TensorRT on CUDA, OpenVINO on CPU), "engine", "openvino", "onnx" or "none".
+MODEL_EXPORT_FORMAT = os.environ.get("MODEL_EXPORT_FORMAT", "auto")
+
+# Compile the PyTorch model with CUDA graphs when it is not exported ("0" disables).
+TORCH_COMPILE = os.environ.get("TORCH_COMPILE", "1") != "0"
+
 # =============================================================================
 # OPTIONAL SERVICES
 # =============================================================================
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_MAX_CONCURRENCY = 8  # Gemini calls in flight at once, across all requests
+GEMINI_TIMEOUT = 180  # Seconds a full Gemini analysis may take
 
 # =============================================================================
 # PROCESSING SETTINGS
 # =============================================================================
 TILE_SIZE = 640
 DPI = 350
+# Render pages at DRAFT_DPI first and re-render at DPI only when the draft
+# pass finds nothing or only low-confidence detections
+ADAPTIVE_DPI = os.environ.get("ADAPTIVE_DPI", "0") != "0"
+DRAFT_DPI = 150
+ADAPTIVE_MIN_CONFIDENCE = 0.60
 OVERLAP_PERCENT = 0.25
 DEFAULT_CONFIDENCE = 0.40
 MAX_WORKERS = 4
+PAGE_WORKERS = 2  # Pages analyzed concurrently when parallel processing is on
+TILE_BATCH_SIZE = 8
+BATCH_WAIT_MS = 25
 MAX_CACHE_SIZE = 1000
+FAILED_TILE_TTL = 30  # Seconds a tile whose detection failed is not retried
+PAGE_CACHE_SIZE = 4  # Rendered pages kept in memory (each can be hundreds of MB)
+VISUALIZATION_CACHE_SIZE = 16  # Annotated page JPEGs kept per worker (a few MB each)
+CACHE_DIR = os.environ.get("CACHE_DIR", str(BASE_DIR / "cache"))
+CACHE_MAX_MB = int(os.environ.get("CACHE_MAX_MB", 2048))  # Disk cache size; least recently used files go first
+CACHE_MAX_AGE_DAYS = 14  # Disk cache entries unused for this long are removed
+CACHE_PRUNE_INTERVAL = 300  # Seconds between disk cache size checks in each worker
 
 # =============================================================================
 # FLASK SETTINGS
 # =============================================================================
 MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 50MB max file size
 PORT = int(os.environ.get('PORT', 5003))
+MAX_ANALYSIS_JOBS = 256  # Finished jobs kept in CACHE_DIR/jobs; older ones are dropped
+ANALYSIS_JOB_TTL = 3600  # Seconds a finished job (and its uploaded PDF) is kept
+
+# =============================================================================
+# WSGI SERVER SETTINGS
+# =============================================================================
+WEB_WORKERS = max(1, int(os.environ.get('WEB_WORKERS', 4)))
+WEB_THREADS = max(1, int(os.environ.get('WEB_THREADS', 4)))
+
+
+def worker_cpus(worker_index: int) -> List[int] | None:
+    """
+    CPUs web worker ``worker_index`` (0-based) is pinned to
+
+    Workers get equal slices of the physical cores this process may use. On
+    most Linux systems the first logical CPUs are distinct physical cores;
+    hyperthread siblings come after them.
+
+    Returns:
+        List of CPU ids, or None when CPU affinity is unavailable
+    """
+    try:
+        import psutil
+
+        allowed = psutil.Process().cpu_affinity()
+    except (ImportError, AttributeError):  # psutil missing, or no affinity API (macOS)
+        return None
+
+    physical_cores = psutil.cpu_count(logical=False) or len(allowed)
+    allowed = allowed[:physical_cores]
+    per_worker = max(1, len(allowed) // WEB_WORKERS)
+    slot = worker_index % max(1, len(allowed) // per_worker)
+    return allowed[slot * per_worker:(slot + 1) * per_worker]
+
+
+# CPU cores each web worker process gets for numpy/torch math: the size of the
+# slice it is pinned to, so its thread pools match the cores it can run on
+THREADS_PER_WORKER = len(worker_cpus(0) or []) or max(1, (os.cpu_count() or 1) // WEB_WORKERS)
 
 # =============================================================================
 # LOGGING
@@ -136,20 +222,21 @@ def validate_config():
     """Validate configuration and log status"""
     logger = logging.getLogger(__name__)
 
-    logger.info("=" * 70)
-    logger.info("CONFIGURATION CHECK:")
-    logger.info(f"  Local Model Path: {LOCAL_MODEL_PATH}")
-    logger.info(
-        "  Local Model Status: %s",
-        "FOUND" if LOCAL_MODEL_FOUND else "NOT FOUND",
-    )
+    lines = [
+        "=" * 70,
+        "CONFIGURATION CHECK:",
+        f"  Local Model Path: {LOCAL_MODEL_PATH}",
+        f"  Local Model Status: {'FOUND' if LOCAL_MODEL_FOUND else 'NOT FOUND'}",
+    ]
     if LOCAL_MODEL_SEARCH_PATHS:
-        logger.info("  Local Model Search Paths:")
+        existing = {path for path in LOCAL_MODEL_SEARCH_PATHS if os.path.exists(path)}
+        lines.append("  Local Model Search Paths:")
         for candidate in LOCAL_MODEL_SEARCH_PATHS:
-            status = "FOUND" if os.path.exists(candidate) else "MISSING"
-            logger.info("    - %s (%s)", candidate, status)
-    logger.info(f"  Gemini API Key: {'SET' if GEMINI_API_KEY else 'NOT SET (optional)'}")
-    logger.info("=" * 70)
+            status = "FOUND" if candidate in existing else "MISSING"
+            lines.append(f"    - {candidate} ({status})")
+    lines.append(f"  Gemini API Key: {'SET' if GEMINI_API_KEY else 'NOT SET (optional)'}")
+    lines.append("=" * 70)
+    logger.info("\n".join(lines))
 
     # Check for local model availability
     model_available = LOCAL_MODEL_FOUND
@@ -0,0 +1,34 @@
+"""Gunicorn settings for Fire Alarm PDF Analyzer.
+
+Run with ``gunicorn -c gunicorn.conf.py "app:create_app()"``. ``preload_app`` loads the
+YOLO weights once in the master process so forked workers share them
+copy-on-write instead of each loading their own copy. CUDA does not survive
+fork(), so a CUDA detector is instead loaded by each worker in ``post_fork``.
+"""
+import config
+
+bind = f"0.0.0.0:{config.PORT}"
+workers = config.WEB_WORKERS
+threads = config.WEB_THREADS
+preload_app = True
+timeout = 300
+
+
+def post_fork(server, worker):
+    """Pin the worker to its cores, then load what cannot cross fork()."""
+    _pin_to_cores(server, worker)
+    # With preload_app this is the app the master built; a CUDA detector it
+    # deferred is loaded here, in the worker that will use it.
+    worker.app.wsgi().analyzer.ensure_local_detector()
+
+
+def _pin_to_cores(server, worker):
+    """Pin each worker to its own slice of physical cores."""
+    cores = config.worker_cpus(worker.age - 1)
+    if not cores:
+        return
+
+    import psutil
+
+    psutil.Process().cpu_affinity(cores)
+    server.log.info("Worker %s pinned to CPUs %s", worker.pid, cores)
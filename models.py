@@ -1,11 +1,11 @@
 """
 Data models for Fire Alarm PDF Analyzer
 """
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import Optional, List
 
 
-@dataclass
+@dataclass(slots=True)
 class FireAlarmDevice:
     """Represents a detected fire alarm device"""
     device_type: str
@@ -35,7 +35,25 @@ class PageAnalysis:
     
     def to_dict(self):
         """Convert to dictionary"""
-        data = asdict(self)
-        # Convert device objects to dicts
-        data['devices'] = [d if isinstance(d, dict) else asdict(d) for d in self.devices]
-        return data
+        # Built by hand so devices are converted once, not also by asdict()
+        return {
+            'page_number': self.page_number,
+            'is_fire_alarm_page': self.is_fire_alarm_page,
+            'page_type': self.page_type,
+            'devices': [d if isinstance(d, dict) else d.to_dict() for d in self.devices],
+            'keyed_notes': list(self.keyed_notes),
+            'specifications': list(self.specifications),
+        }
+
+
+@dataclass(slots=True)
+class PageText:
+    """Extracted text of a single PDF page"""
+    page_number: int
+    text: str
+    # Casefolded copy of text, filled in on first keyword scan
+    text_folded: Optional[str] = field(default=None, repr=False, compare=False)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {'page_number': self.page_number, 'text': self.text}
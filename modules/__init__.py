@@ -1,60 +1,95 @@
 """Modules Package"""
+import importlib
+import importlib.util
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-# Public interface exposed when importing from ``modules``.
-__all__ = []
+# Submodules are imported on first attribute access (PEP 562), so importing
+# ``modules`` or one of its submodules does not pull in Gemini/torch/etc.
+# until the symbol that needs them is used.
+_REQUIRED = {
+    "PDFProcessor": ("pdf_processor", "PDFProcessor"),
+    "DetectionVisualizer": ("visualizer", "DetectionVisualizer"),
+    "TileBatcher": ("batcher", "TileBatcher"),
+    "ResultCache": ("cache", "ResultCache"),
+    "GeminiAnalyzer": ("gemini_analyzer", "GeminiFireAlarmAnalyzer"),
+}
+_OPTIONAL = {
+    "LocalYOLODetector": ("local_yolo_detector", "LocalYOLODetector"),
+    "UnifiedGeminiAnalyzer": ("gemini_analyzer_unified", "GeminiAnalyzer"),
+}
+# Third-party package each optional symbol cannot load without
+_OPTIONAL_DEPENDENCIES = {
+    "LocalYOLODetector": "ultralytics",
+    "UnifiedGeminiAnalyzer": "google.generativeai",
+}
+
+
+def _dependency_installed(package: str) -> bool:
+    """Check a package can be found without importing it."""
+
+    try:
+        return importlib.util.find_spec(package) is not None
+    except (ImportError, ValueError):
+        return False
 
 
-LOCAL_YOLO_IMPORT_ERROR: str | None = None
-__all__.append("LOCAL_YOLO_IMPORT_ERROR")
+# Public interface exposed when importing from ``modules``. Optional symbols
+# whose dependency is not installed are left out, so ``import *`` does not
+# attempt (and log) an import that is bound to fail.
+__all__ = [
+    "LOCAL_YOLO_IMPORT_ERROR",
+    *_REQUIRED,
+    *(name for name in _OPTIONAL if _dependency_installed(_OPTIONAL_DEPENDENCIES[name])),
+]
 
 
 def _import_required(module_name: str, symbol: str):
     """Import a symbol from the modules package, logging on failure."""
 
     try:
-        module = __import__(module_name, globals(), locals(), [symbol], 1)
+        module = importlib.import_module(f".{module_name}", __name__)
         return getattr(module, symbol)
     except ImportError as exc:  # pragma: no cover - defensive logging
         logger.error("Error importing %s: %s", symbol, exc, exc_info=True)
         raise
 
 
-PDFProcessor = _import_required("pdf_processor", "PDFProcessor")
-__all__.append("PDFProcessor")
-
-try:
-    from .local_yolo_detector import LocalYOLODetector
-except ImportError as exc:  # pragma: no cover - optional dependency
-    LOCAL_YOLO_IMPORT_ERROR = str(exc)
-    logger.error("Local YOLO detector unavailable: %s", exc, exc_info=True)
-    LocalYOLODetector = None
-else:
-    __all__.append("LocalYOLODetector")
-
-DetectionVisualizer = _import_required("visualizer", "DetectionVisualizer")
-__all__.append("DetectionVisualizer")
-
-GeminiAnalyzer = _import_required("gemini_analyzer", "GeminiFireAlarmAnalyzer")
-__all__.append("GeminiAnalyzer")
-
-
-try:
-    from .roboflow_detector import RoboflowDetector  # type: ignore[attr-defined]
-except ImportError as exc:  # pragma: no cover - optional dependency
-    logger.warning("Roboflow detector unavailable: %s", exc)
-    RoboflowDetector = None
-else:
-    __all__.append("RoboflowDetector")
-
-try:
-    from .gemini_analyzer_unified import GeminiAnalyzer as UnifiedGeminiAnalyzer
-except ImportError as exc:  # pragma: no cover - optional dependency
-    logger.warning("Unified Gemini analyzer unavailable: %s", exc)
-    UnifiedGeminiAnalyzer = None
-else:
-    __all__.append("UnifiedGeminiAnalyzer")
+def _import_optional(name: str):
+    """Import an optional symbol, returning None (and recording why) on failure."""
 
+    module_name, symbol = _OPTIONAL[name]
+    try:
+        module = importlib.import_module(f".{module_name}", __name__)
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        if name == "LocalYOLODetector":
+            globals()["LOCAL_YOLO_IMPORT_ERROR"] = str(exc)
+            logger.error("Local YOLO detector unavailable: %s", exc, exc_info=True)
+        else:
+            logger.warning("%s unavailable: %s", name, exc)
+        return None
+    return getattr(module, symbol)
+
+
+def __getattr__(name: str):
+    if name == "LOCAL_YOLO_IMPORT_ERROR":
+        # Only meaningful once the detector import has been attempted.
+        if "LocalYOLODetector" not in globals():
+            __getattr__("LocalYOLODetector")
+        return globals().setdefault("LOCAL_YOLO_IMPORT_ERROR", None)
+
+    if name in _REQUIRED:
+        value = _import_required(*_REQUIRED[name])
+    elif name in _OPTIONAL:
+        value = _import_optional(name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,142 @@
+"""
+Tile Batcher Module - Coalesces concurrent tile inferences into batched forwards
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+import numpy as np
+from PIL import Image
+
+from config import BATCH_WAIT_MS, TILE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingTile:
+    """A tile waiting for inference plus the slot its result is written to"""
+
+    __slots__ = ('image', 'confidence', 'event', 'result', 'error')
+
+    def __init__(self, image: np.ndarray, confidence: float):
+        self.image = image
+        self.confidence = confidence
+        self.event = threading.Event()
+        self.result: List[Dict] = []
+        self.error = None
+
+
+class TileBatcher:
+    """
+    Dynamic batcher for the local detector.
+
+    Tiles submitted from any thread (and any request) are collected by a single
+    background worker, which waits up to ``wait_ms`` for up to ``max_batch``
+    tiles and runs them through one ``model.predict`` call. Submitting threads
+    convert their tiles to arrays first, so the worker only stacks and infers.
+    """
+
+    def __init__(self, detector, max_batch: int = TILE_BATCH_SIZE,
+                 wait_ms: float = BATCH_WAIT_MS):
+        self.detector = detector
+        self.max_batch = max(1, max_batch)
+        self.wait_seconds = max(0.0, wait_ms) / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, tile_image: Image.Image, confidence: float) -> List[Dict]:
+        """
+        Queue a tile for batched inference and block until its result is ready
+
+        Args:
+            tile_image: PIL Image tile
+            confidence: Detection confidence threshold for this tile
+
+        Returns:
+            List of prediction dicts for the tile
+        """
+        self._ensure_worker()
+        pending = _PendingTile(self.detector.tile_array(tile_image), confidence)
+        self._queue.put(pending)
+        pending.event.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def submit_many(self, tile_images: List[Image.Image], confidence: float) -> List[List[Dict]]:
+        """
+        Queue several tiles at once and block until all their results are ready
+
+        The tiles are enqueued together, so they land in the same (or adjacent)
+        batches instead of trickling in one per calling thread.
+
+        Returns:
+            List of prediction lists, one per tile
+        """
+        self._ensure_worker()
+        pending_tiles = [_PendingTile(self.detector.tile_array(tile_image), confidence)
+                         for tile_image in tile_images]
+        for pending in pending_tiles:
+            self._queue.put(pending)
+        for pending in pending_tiles:
+            pending.event.wait()
+            if pending.error is not None:
+                raise pending.error
+        return [pending.result for pending in pending_tiles]
+
+    def _ensure_worker(self) -> None:
+        """Start the worker thread lazily; threads do not survive a gunicorn fork."""
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                # Anything queued before the fork belongs to the parent process.
+                self._queue = queue.Queue()
+            self._worker = threading.Thread(target=self._run, name='tile-batcher', daemon=True)
+            self._worker_pid = pid
+            self._worker.start()
+            logger.info(f"Tile batcher started (max_batch={self.max_batch}, "
+                        f"wait={self.wait_seconds * 1000:.0f}ms)")
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.wait_seconds
+
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch: List[_PendingTile]) -> None:
+        # Run once at the loosest threshold, then filter per tile.
+        batch_confidence = min(pending.confidence for pending in batch)
+
+        try:
+            per_tile = self.detector.predict_batch([pending.image for pending in batch],
+                                                   batch_confidence)
+        except Exception as e:
+            logger.error(f"Error during batched detection: {str(e)}")
+            for pending in batch:
+                pending.error = e
+                pending.event.set()
+            return
+
+        for pending, predictions in zip(batch, per_tile):
+            pending.result = [p for p in predictions if p['confidence'] >= pending.confidence]
+            pending.event.set()
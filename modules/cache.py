@@ -0,0 +1,320 @@
+"""
+Result Cache Module - Content-addressed cache for rendered pages and detection results
+"""
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from config import (CACHE_DIR, CACHE_MAX_AGE_DAYS, CACHE_MAX_MB, CACHE_PRUNE_INTERVAL,
+                    PAGE_CACHE_SIZE)
+from models import PageText
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+_PAGE_HEADER = struct.Struct(">II")
+_DISK_SUBDIRS = ('pages', 'detections', 'text', 'thumbs')
+
+
+class ResultCache:
+    """
+    Two-tier cache keyed on the SHA-256 of the uploaded PDF.
+
+    Rendered pages are kept in a small in-memory LRU and persisted to disk as
+    zstd-compressed raw RGB (memory only when ``zstandard`` is not installed,
+    since encoding full pages as PNG costs more than re-rendering them).
+    Detection results are persisted to disk as JSON, keyed on the file hash
+    plus the options that produced them. Extracted page text is kept in a
+    small in-memory LRU and persisted as JSON, keyed on the file hash alone.
+    Preview thumbnails are written to disk as JPEG so any worker can serve them.
+    
+    The disk cache is pruned to ``max_bytes`` (least recently used files
+    first) and files unused for ``max_age`` seconds are removed.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_pages: int = PAGE_CACHE_SIZE,
+                 max_texts: int = 8, max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+                 max_age: float = CACHE_MAX_AGE_DAYS * 86400):
+        self.cache_dir = Path(cache_dir)
+        self.max_pages = max_pages
+        self.max_texts = max_texts
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.last_prune = None
+        self.pages = OrderedDict()
+        self.texts = OrderedDict()
+        self.file_hashes: Dict[Tuple[str, int, int], str] = {}
+        self.lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _file_key(path: str) -> Tuple[str, int, int]:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def remember_hash(self, path: str, file_hash: str):
+        """Record a hash computed elsewhere (e.g. while streaming an upload)"""
+        key = self._file_key(path)
+        with self.lock:
+            self.file_hashes[key] = file_hash
+
+    def hash_file(self, path: str) -> str:
+        """Return the SHA-256 of a file, memoized on (path, mtime, size)"""
+        key = self._file_key(path)
+        with self.lock:
+            cached = self.file_hashes.get(key)
+        if cached:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        file_hash = digest.hexdigest()
+
+        with self.lock:
+            self.file_hashes[key] = file_hash
+        return file_hash
+
+    # ------------------------------------------------------------------
+    # Rendered pages
+    # ------------------------------------------------------------------
+    def get_page(self, file_hash: str, page_number: int, dpi: int) -> Optional[Image.Image]:
+        """Get a rendered page from memory, falling back to disk"""
+        key = (file_hash, page_number, dpi)
+        with self.lock:
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                return self.pages[key]
+
+        image = self._read_page(file_hash, page_number, dpi)
+        if image is not None:
+            self._remember_page(key, image)
+        return image
+
+    def has_page(self, file_hash: str, page_number: int, dpi: int) -> bool:
+        """Check whether a rendered page is cached, without loading it"""
+        with self.lock:
+            if (file_hash, page_number, dpi) in self.pages:
+                return True
+        return zstandard is not None and self._page_path(file_hash, page_number, dpi).is_file()
+
+    def set_page(self, file_hash: str, page_number: int, dpi: int, image: Image.Image):
+        """Cache a rendered page in memory and, when zstd is available, on disk"""
+        self._remember_page((file_hash, page_number, dpi), image)
+        if zstandard is None:
+            return
+        try:
+            self._write_page(file_hash, page_number, dpi, image)
+        except OSError as e:
+            logger.warning(f"Could not persist rendered page {page_number}: {e}")
+
+    def _remember_page(self, key: Tuple[str, int, int], image: Image.Image):
+        with self.lock:
+            self.pages[key] = image
+            self.pages.move_to_end(key)
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+
+    def _page_path(self, file_hash: str, page_number: int, dpi: int) -> Path:
+        return self.cache_dir / 'pages' / file_hash[:2] / f"{file_hash}_{page_number}_{dpi}.zst"
+
+    def _read_page(self, file_hash: str, page_number: int, dpi: int) -> Optional[Image.Image]:
+        if zstandard is None:
+            return None
+        path = self._page_path(file_hash, page_number, dpi)
+        if not path.is_file():
+            return None
+
+        try:
+            data = zstandard.ZstdDecompressor().decompress(path.read_bytes())
+            self._touch(path)
+            width, height = _PAGE_HEADER.unpack_from(data)
+            return Image.frombytes('RGB', (width, height), data[_PAGE_HEADER.size:])
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cached page {path}: {e}")
+            return None
+
+    def _write_page(self, file_hash: str, page_number: int, dpi: int, image: Image.Image):
+        path = self._page_path(file_hash, page_number, dpi)
+        if path.exists():
+            return
+
+        payload = _PAGE_HEADER.pack(image.width, image.height) + image.tobytes()
+        data = zstandard.ZstdCompressor(level=3).compress(payload)
+        self._atomic_write(path, lambda f: f.write(data))
+
+    # ------------------------------------------------------------------
+    # Detection results
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _options_key(options: Dict) -> str:
+        encoded = json.dumps(options, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    def _detections_path(self, file_hash: str, options: Dict) -> Path:
+        return (self.cache_dir / 'detections' / file_hash[:2] /
+                f"{file_hash}_{self._options_key(options)}.json")
+
+    def get_detections(self, file_hash: str, options: Dict) -> Optional[Dict]:
+        """Get cached detection results for a file and option set"""
+        path = self._detections_path(file_hash, options)
+        if not path.is_file():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cached detections {path}: {e}")
+            return None
+        self._touch(path)
+        return results
+
+    def set_detections(self, file_hash: str, options: Dict, results: Dict):
+        """Persist detection results for a file and option set"""
+        path = self._detections_path(file_hash, options)
+        try:
+            self._atomic_write(path, lambda f: f.write(json.dumps(results).encode()))
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not persist detection results: {e}")
+
+    # ------------------------------------------------------------------
+    # Extracted text
+    # ------------------------------------------------------------------
+    def _text_path(self, file_hash: str) -> Path:
+        return self.cache_dir / 'text' / file_hash[:2] / f"{file_hash}.json"
+
+    def get_text(self, file_hash: str) -> Optional[List[PageText]]:
+        """Get cached per-page text for a file from memory, falling back to disk"""
+        with self.lock:
+            if file_hash in self.texts:
+                self.texts.move_to_end(file_hash)
+                return self.texts[file_hash]
+
+        path = self._text_path(file_hash)
+        if not path.is_file():
+            return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                pages = [PageText(**page) for page in json.load(f)]
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Discarding unreadable cached text {path}: {e}")
+            return None
+
+        self._touch(path)
+        self._remember_text(file_hash, pages)
+        return pages
+
+    def set_text(self, file_hash: str, pages: List[PageText]):
+        """Cache per-page text for a file in memory and on disk"""
+        self._remember_text(file_hash, pages)
+        path = self._text_path(file_hash)
+        try:
+            self._atomic_write(path, lambda f: f.write(json.dumps([page.to_dict() for page in pages]).encode()))
+        except (OSError, TypeError) as e:
+            logger.warning(f"Could not persist extracted text: {e}")
+
+    def _remember_text(self, file_hash: str, pages: List[PageText]):
+        with self.lock:
+            self.texts[file_hash] = pages
+            self.texts.move_to_end(file_hash)
+            while len(self.texts) > self.max_texts:
+                self.texts.popitem(last=False)
+
+    # ------------------------------------------------------------------
+    # Preview thumbnails
+    # ------------------------------------------------------------------
+    def thumbnail_path(self, file_hash: str, page_number: int) -> Path:
+        """Path of the JPEG thumbnail for a page (which may not exist yet)"""
+        return self.cache_dir / 'thumbs' / file_hash[:2] / f"{file_hash}_{page_number}.jpg"
+
+    def set_thumbnail(self, file_hash: str, page_number: int, data: bytes):
+        """Persist an encoded JPEG page thumbnail"""
+        path = self.thumbnail_path(file_hash, page_number)
+        self._atomic_write(path, lambda f: f.write(data))
+
+    # ------------------------------------------------------------------
+    # Disk housekeeping
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _touch(path: Path):
+        """Mark a disk entry as recently used so pruning keeps it"""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def prune(self):
+        """Remove stale disk entries, then the least recently used until under ``max_bytes``"""
+        entries = []
+        for subdir in _DISK_SUBDIRS:
+            for root, _, names in os.walk(self.cache_dir / subdir):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - self.max_age
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info(f"Pruned {removed} cache files; {total / (1024 * 1024):.0f} MB left in {self.cache_dir}")
+
+    def _maybe_prune(self):
+        """Prune the disk cache at most once per ``CACHE_PRUNE_INTERVAL`` in this process"""
+        now = time.monotonic()
+        with self.lock:
+            if self.last_prune is not None and now - self.last_prune < CACHE_PRUNE_INTERVAL:
+                return
+            self.last_prune = now
+        try:
+            self.prune()
+        except OSError as e:
+            logger.warning(f"Could not prune cache directory: {e}")
+
+    def _atomic_write(self, path: Path, writer):
+        """Write via a temp file + rename so readers never see partial files"""
+        self._maybe_prune()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                writer(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
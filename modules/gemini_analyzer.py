@@ -3,34 +3,246 @@ Gemini Analyzer Module
 Handles AI-powered analysis of fire alarm specifications using Google's Gemini API
 """
 
+import asyncio
 import logging
 import os
-import json
-import re
-from typing import Dict, List, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Iterable, List, Optional
 from datetime import datetime
-import google.generativeai as genai
+from itertools import islice
+from string import Template
 
 # Corrected relative import for your module structure
+from .gemini_client import get_client
+from .gemini_text import JSON_RESPONSE_CONFIG, has_signal, join_capped, parse_json
+from .keywords import KeywordMatcher
 from .pdf_processor import PDFProcessor
-from config import GEMINI_API_KEY, GEMINI_MODEL # Assumes GEMINI_MODEL is in config
+from models import PageText
+from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_TIMEOUT, MAX_WORKERS # Assumes GEMINI_MODEL is in config
 
 logger = logging.getLogger("fire-alarm-analyzer")
 
+# Built once per process; each page is then scanned in a single pass.
+FA_KEYWORDS = KeywordMatcher([
+    'fire alarm', 'fa device', 'smoke detector', 'heat detector',
+    'pull station', 'notification device', 'horn strobe', 'speaker strobe',
+    'fire alarm control', 'facp', 'control panel', 'annunciator',
+    'special systems', 'power plan', 'electrical plan',
+    'life safety plan', 'fire alarm general notes', 'fire alarm riser',
+    'special systems plan', 'fire protection plan',
+    # Not a fire alarm keyword; used to drop mounting-height boilerplate pages
+    'mounting height',
+])
+MECHANICAL_KEYWORDS = KeywordMatcher([
+    'mechanical', 'hvac', 'duct', 'damper', 'air handler', 'rtu', 'ahu'
+])
+
+
+def _fa_pages_text(pages_text: List[PageText], fa_pages: List[int]) -> str:
+    """Labelled text of the fire alarm pages, capped for a prompt"""
+    fa_page_set = frozenset(fa_pages)
+    return join_capped((
+        f"PAGE {p.page_number}:\n{p.text}"
+        for p in pages_text
+        if p.page_number in fa_page_set
+    ), 15000)
+
+
+def _mech_pages_text(pages_text: List[PageText]) -> str:
+    """Labelled text of the mechanical pages, matched and joined in one capped pass"""
+    return join_capped((
+        f"PAGE {p.page_number}:\n{p.text}"
+        for p in pages_text
+        if MECHANICAL_KEYWORDS.search_page(p)
+    ), 15000)
+
+
+def _front_pages_text(pages_text: List[PageText]) -> str:
+    """Text of the first 10 pages (cover sheets, codes and general notes)"""
+    return join_capped((p.text for p in islice(pages_text, 10)), 15000)
+
+
+# Sections returned by the combined request and the JSON type each must have
+_SECTION_TYPES = {
+    'project_info': dict,
+    'code_requirements': dict,
+    'fire_alarm_notes': list,
+    'mechanical_devices': dict,
+    'specifications': dict,
+}
+
+# Prompt templates are built once at import; each call only substitutes text.
+_PROMPT_COMBINED_HEAD = Template("""Analyze this construction bid set for fire alarm scope. Return ONE JSON object with the keys described below.
+
+FRONT PAGES (cover sheets and general notes):
+$front_text
+""")
+
+_PROMPT_COMBINED_FA_PAGES = Template("""
+FIRE ALARM PAGES:
+$fa_text
+""")
+
+_PROMPT_COMBINED_MECH_PAGES = Template("""
+MECHANICAL PAGES:
+$mech_text
+""")
+
+_PROMPT_COMBINED_KEYS = """
+Return JSON with these keys:
+- project_info: object with project_name, location, project_type, scope_summary, owner, architect, engineer, project_number (null if not found), from the FRONT PAGES.
+- code_requirements: object with building_codes, fire_codes, electrical_codes, fire_alarm_standards, local_codes, each a list of strings (empty list if none), from the FRONT PAGES.
+"""
+
+_PROMPT_COMBINED_FA_KEYS = """- fire_alarm_notes: array of objects with page, note_type (e.g. "System Requirement", "Device Specification", "Installation Note") and content. Only PROJECT-SPECIFIC fire alarm notes from the FIRE ALARM PAGES: requirements, device quantities or locations, system specifications, special installation and coordination notes. Skip standard NFPA mounting heights, generic "shall comply with" statements, standard wall/ceiling distances, boilerplate code text and non-fire-alarm electrical notes.
+- specifications: object with CONTROL_PANEL, DEVICES, NOTIFICATION_DEVICES, SYSTEM_TYPE, COMMUNICATION, POWER_REQUIREMENTS, MONITORING, INTEGRATION (null if not found), from the FIRE ALARM PAGES.
+"""
+
+_PROMPT_COMBINED_MECH_KEYS = """- mechanical_devices: object with duct_detectors and dampers arrays from the MECHANICAL PAGES. Each device has page, device_type, location, quantity and specifications. Only include devices that require fire alarm monitoring or control; use empty arrays if none.
+"""
+
+_PROMPT_COVER = Template("""Analyze these construction bid set cover pages and extract key project information.
+
+COVER PAGES TEXT:
+$text 
+
+Extract the following information:
+1. PROJECT NAME: Official name of the project
+2. PROJECT LOCATION: Address or location
+3. PROJECT TYPE: (e.g., School, Hospital, Office Building, etc.)
+4. SCOPE SUMMARY: Brief summary of the overall project scope
+5. OWNER/CLIENT: Name of the project owner or client
+6. ARCHITECT: Name of the architecture firm
+7. ENGINEER: Name of the engineering firm(s)
+8. PROJECT NUMBER: Any project reference numbers
+
+Format your response as JSON with these keys: project_name, location, project_type, scope_summary, owner, architect, engineer, project_number.
+If information is not found, use null.
+""")
+
+_PROMPT_CODES = Template("""Analyze this construction document and identify all applicable codes and standards.
+
+DOCUMENT TEXT:
+$text
+
+Extract:
+1. BUILDING CODES: (e.g., IBC 2021, CBC, etc.)
+2. FIRE CODES: (e.g., IFC, NFPA codes specific to fire alarm)
+3. ELECTRICAL CODES: (e.g., NEC 2020)
+4. FIRE ALARM STANDARDS: (e.g., NFPA 72, NFPA 101)
+5. LOCAL CODES: Any jurisdiction-specific requirements
+
+Format response as JSON with keys: building_codes, fire_codes, electrical_codes, fire_alarm_standards, local_codes.
+Each should be a list of strings. If none found, use empty list.
+""")
+
+_PROMPT_FA_NOTES = Template("""Analyze these electrical/fire alarm pages and extract ONLY the PROJECT-SPECIFIC fire alarm notes.
+
+PAGES TEXT:
+$text
+
+Extract fire alarm notes that are:
+✓ Project-specific requirements
+✓ Device quantities or locations
+✓ System specifications
+✓ Special installation requirements
+✓ Coordination notes with other trades
+
+DO NOT extract:
+✗ Standard NFPA mounting heights
+✗ Generic "shall comply with" statements
+✗ Standard distance from walls/ceilings
+✗ Boilerplate code compliance text
+✗ General electrical notes not related to fire alarm
+
+Format as JSON array with objects containing:
+- page: page number
+- note_type: (e.g., "System Requirement", "Device Specification", "Installation Note")
+- content: the actual note text
+
+Example:
+[{"page": 5, "note_type": "System Requirement", "content": "All devices shall be addressable"}]
+""")
+
+_PROMPT_MECHANICAL = Template("""Analyze these mechanical pages and extract fire alarm-related devices.
+
+MECHANICAL PAGES TEXT:
+$text
+
+Extract:
+1. DUCT DETECTORS: Location, type, specifications
+2. FIRE/SMOKE DAMPERS: Location, type, specifications
+
+For each device, extract:
+- page: page number
+- device_type: specific type (e.g., "Duct Smoke Detector", "Fire Damper")
+- location: where it's located (e.g., "RTU-1", "all transfer ducts")
+- quantity: if specified
+- specifications: any specific requirements (e.g., "provide relay to FACP")
+
+Format as JSON with keys:
+- duct_detectors: array of duct detector objects
+- dampers: array of damper objects
+
+Only return devices that require fire alarm integration. Ignore generic HVAC notes or mechanical requirements that do not involve fire alarm monitoring or control. If none found, use empty arrays.
+""")
+
+_PROMPT_SPECIFICATIONS = Template("""Extract fire alarm system specifications from these pages.
+
+FIRE ALARM PAGES:
+$text
+
+Extract:
+1. CONTROL PANEL: Manufacturer, model, features
+2. DEVICES: Types of devices required (smoke, heat, pull stations, etc.)
+3. NOTIFICATION DEVICES: Types (horns, strobes, speakers)
+4. SYSTEM TYPE: (e.g., addressable, conventional, hybrid)
+5. COMMUNICATION: How system communicates (Ethernet, phone line, cellular)
+6. POWER REQUIREMENTS: Backup battery, UPS requirements
+7. MONITORING: Central station monitoring requirements
+8. INTEGRATION: Integration with other systems (access control, BMS, etc.)
+
+Format as JSON with these keys: CONTROL_PANEL, DEVICES, NOTIFICATION_DEVICES, SYSTEM_TYPE, COMMUNICATION, POWER_REQUIREMENTS, MONITORING, INTEGRATION.
+Use null if not found.
+""")
+
+_analysis_pool = None
+_analysis_pool_pid = None
+_analysis_pool_lock = threading.Lock()
+
+
+def _get_analysis_pool() -> ThreadPoolExecutor:
+    """Return this process's analysis pool; threads do not survive a gunicorn fork."""
+    global _analysis_pool, _analysis_pool_pid
+    pid = os.getpid()
+    with _analysis_pool_lock:
+        if _analysis_pool is None or _analysis_pool_pid != pid:
+            _analysis_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='gemini-analysis')
+            _analysis_pool_pid = pid
+        return _analysis_pool
+
+
 class GeminiFireAlarmAnalyzer:
-    """AI-powered fire alarm specification analyzer using Gemini"""
+    """
+    AI-powered fire alarm specification analyzer using Gemini
+    
+    Instance state is only set in ``__init__`` and the model and client are
+    process-wide singletons, so one analyzer can serve concurrent requests.
+    """
     
     def __init__(self, api_key: Optional[str] = None):
         """Initialize Gemini analyzer"""
         self.api_key = api_key or GEMINI_API_KEY
         self.model = None
+        self.client = None
         self.pdf_processor = PDFProcessor()
         
         if self.api_key:
             try:
-                genai.configure(api_key=self.api_key)
-                # Use GEMINI_MODEL from config
-                self.model = genai.GenerativeModel(GEMINI_MODEL) 
+                # Shared per process; use GEMINI_MODEL from config
+                self.client = get_client(self.api_key)
+                self.model = self.client.model
                 logger.info(f"✅ Gemini AI initialized successfully with {GEMINI_MODEL}")
             except Exception as e:
                 logger.error(f"Failed to initialize Gemini: {str(e)}")
@@ -41,35 +253,15 @@ class GeminiFireAlarmAnalyzer:
         """Return True if Gemini model is initialized and ready."""
         return self.model is not None
 
-    @staticmethod
-    def _parse_json(raw_text: str, default: Any) -> Any:
-        """Safely parse JSON from Gemini responses"""
-        if not raw_text:
-            return default
-        
-        # Clean up markdown code blocks
-        cleaned = re.sub(r"^```(?:json)?", "", raw_text.strip(), flags=re.IGNORECASE | re.MULTILINE)
-        cleaned = re.sub(r"```$", "", cleaned.strip(), flags=re.MULTILINE)
-        
-        # Find the first valid JSON object or array
-        match = re.search(r"\{.*\}|\[.*\]", cleaned, re.DOTALL)
-        if not match:
-            logger.warning(f"No JSON object or array found in Gemini response: {cleaned}")
-            return default
-            
-        json_str = match.group(0)
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError as exc:
-            logger.error(f"Failed to parse JSON: {exc}. Raw string was: {json_str}")
-            # Try to fix common issues like trailing commas
-            json_str = re.sub(r",\s*([\]\}])", r"\1", json_str)
-            try:
-                return json.loads(json_str)
-            except Exception:
-                logger.error("Failed to parse JSON even after attempting fixes.")
-                return default
-
+    def analyze_many(self, pdf_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze several PDFs in parallel, returning results in input order
+        
+        Text extraction runs on up to MAX_WORKERS threads while the Gemini
+        calls for every PDF share the client's event loop.
+        """
+        return list(_get_analysis_pool().map(self.analyze_pdf, pdf_paths))
+    
     def analyze_pdf(self, pdf_path: str) -> Dict[str, Any]:
         """
         Comprehensive fire alarm analysis of construction bid set PDF
@@ -92,38 +284,23 @@ class GeminiFireAlarmAnalyzer:
                     'error': 'Failed to extract text from PDF'
                 }
             
-            # Step 1: Analyze cover pages for project info
-            logger.info("Analyzing cover pages...")
-            project_info = self._analyze_cover_pages(pages_text[:5])  # First 5 pages
-            
-            # Step 2: Identify fire alarm relevant pages
-            logger.info("Identifying fire alarm pages...")
-            fa_pages = self._identify_fire_alarm_pages(pages_text)
-            
-            # Step 3: Extract code requirements
-            logger.info("Extracting code requirements...")
-            codes = self._extract_code_requirements(pages_text)
-            
-            # Step 4: Extract fire alarm notes from electrical pages
-            logger.info("Extracting fire alarm notes...")
-            fa_notes = self._extract_fire_alarm_notes(pages_text, fa_pages)
-            
-            # Step 5: Extract mechanical fire alarm devices
-            logger.info("Extracting mechanical FA devices...")
-            mechanical_devices = self._extract_mechanical_fa_devices(pages_text)
-            
-            # Step 6: Extract specifications
-            logger.info("Extracting specifications...")
-            specifications = self._extract_specifications(pages_text, fa_pages)
+            # The Gemini calls are independent, so they all run concurrently
+            # on the shared client loop while this thread waits.
+            future = self.client.run(self._analyze_pages(pages_text))
+            try:
+                sections = future.result(timeout=GEMINI_TIMEOUT)
+            except FutureTimeoutError:
+                future.cancel()
+                raise TimeoutError(f"Gemini analysis timed out after {GEMINI_TIMEOUT}s")
             
             results = {
                 'success': True,
-                'project_info': project_info,
-                'code_requirements': codes,
-                'fire_alarm_pages': fa_pages,
-                'fire_alarm_notes': fa_notes,
-                'mechanical_devices': mechanical_devices,
-                'specifications': specifications,
+                'project_info': sections['project_info'],
+                'code_requirements': sections['code_requirements'],
+                'fire_alarm_pages': sections['fire_alarm_pages'],
+                'fire_alarm_notes': sections['fire_alarm_notes'],
+                'mechanical_devices': sections['mechanical_devices'],
+                'specifications': sections['specifications'],
                 'total_pages': len(pages_text),
                 'analysis_timestamp': datetime.now().isoformat()
             }
@@ -138,218 +315,188 @@ class GeminiFireAlarmAnalyzer:
                 'error': str(e)
             }
     
-    def _analyze_cover_pages(self, cover_pages: List[Dict]) -> Dict[str, Any]:
+    async def _analyze_pages(self, pages_text: List[PageText]) -> Dict[str, Any]:
+        """Run every analysis step for the extracted pages"""
+        # Step 1: Identify fire alarm relevant pages (local keyword scan)
+        logger.info("Identifying fire alarm pages...")
+        fa_pages = self._identify_fire_alarm_pages(pages_text)
+        
+        # Steps 2-6: cover pages, codes, FA notes, mechanical devices, specs
+        logger.info("Requesting project info, codes, FA notes, mechanical devices and specifications...")
+        sections = await self._run_all_sections(pages_text, fa_pages)
+        sections['fire_alarm_pages'] = fa_pages
+        return sections
+    
+    async def _run_all_sections(self, pages_text: List[PageText], fa_pages: List[int]) -> Dict[str, Any]:
+        """
+        Extract all Gemini sections with one combined request
+        
+        Any section missing or malformed in the combined response is retried
+        with its own dedicated prompt; those retries run concurrently.
+        """
+        # Built once and shared with any per-section fallbacks below
+        fa_text = _fa_pages_text(pages_text, fa_pages)
+        mech_text = _mech_pages_text(pages_text)
+        if not has_signal(mech_text):
+            mech_text = ''  # A stray "mech" hit is not worth a prompt section
+        front_text = _front_pages_text(pages_text)
+        
+        # Sections with no source text are answered locally, as the
+        # per-section methods do.
+        sections: Dict[str, Any] = {}
+        if not fa_text:
+            sections['fire_alarm_notes'] = []
+            sections['specifications'] = {}
+        if not mech_text:
+            sections['mechanical_devices'] = {'duct_detectors': [], 'dampers': []}
+        if not has_signal(front_text):
+            sections['project_info'] = {}
+            sections['code_requirements'] = {}
+        if len(sections) == len(_SECTION_TYPES):
+            logger.info("No usable page text; skipping Gemini requests")
+            return sections
+        
+        prompt = _PROMPT_COMBINED_HEAD.substitute(front_text=front_text)
+        if fa_text:
+            prompt += _PROMPT_COMBINED_FA_PAGES.substitute(fa_text=fa_text)
+        if mech_text:
+            prompt += _PROMPT_COMBINED_MECH_PAGES.substitute(mech_text=mech_text)
+        prompt += _PROMPT_COMBINED_KEYS
+        if fa_text:
+            prompt += _PROMPT_COMBINED_FA_KEYS
+        if mech_text:
+            prompt += _PROMPT_COMBINED_MECH_KEYS
+        
+        try:
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            combined = parse_json(response_text, {})
+        except Exception as e:
+            logger.warning(f"Combined Gemini request failed, using per-section requests: {str(e)}")
+            combined = {}
+        if not isinstance(combined, dict):
+            combined = {}
+        
+        for key, expected_type in _SECTION_TYPES.items():
+            if key not in sections and isinstance(combined.get(key), expected_type):
+                sections[key] = combined[key]
+        
+        fallbacks = {
+            'project_info': lambda: self._analyze_cover_pages(islice(pages_text, 5)),  # First 5 pages
+            'code_requirements': lambda: self._extract_code_requirements(pages_text, front_text),
+            'fire_alarm_notes': lambda: self._extract_fire_alarm_notes(pages_text, fa_pages, fa_text),
+            'mechanical_devices': lambda: self._extract_mechanical_fa_devices(pages_text, mech_text),
+            'specifications': lambda: self._extract_specifications(pages_text, fa_pages, fa_text),
+        }
+        missing = [key for key in _SECTION_TYPES if key not in sections]
+        if missing:
+            logger.info(f"Requesting sections separately: {', '.join(missing)}")
+            values = await asyncio.gather(*(fallbacks[key]() for key in missing))
+            sections.update(zip(missing, values))
+        
+        return sections
+    
+    async def _analyze_cover_pages(self, cover_pages: Iterable[PageText]) -> Dict[str, Any]:
         """Analyze cover pages for project information"""
         
-        cover_text = "\n\n".join([p['text'] for p in cover_pages])
+        cover_text = join_capped((p.text for p in cover_pages), 15000)
+        if not has_signal(cover_text):
+            return {}
         
-        prompt = f"""Analyze these construction bid set cover pages and extract key project information.
-
-COVER PAGES TEXT:
-{cover_text[:15000]} 
-
-Extract the following information:
-1. PROJECT NAME: Official name of the project
-2. PROJECT LOCATION: Address or location
-3. PROJECT TYPE: (e.g., School, Hospital, Office Building, etc.)
-4. SCOPE SUMMARY: Brief summary of the overall project scope
-5. OWNER/CLIENT: Name of the project owner or client
-6. ARCHITECT: Name of the architecture firm
-7. ENGINEER: Name of the engineering firm(s)
-8. PROJECT NUMBER: Any project reference numbers
-
-Format your response as JSON with these keys: project_name, location, project_type, scope_summary, owner, architect, engineer, project_number.
-If information is not found, use null.
-"""
+        prompt = _PROMPT_COVER.substitute(text=cover_text)
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), {})
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, {})
         except Exception as e:
             logger.error(f"Error analyzing cover pages: {str(e)}")
             return {'error': str(e)}
     
-    def _identify_fire_alarm_pages(self, pages_text: List[Dict]) -> List[int]:
+    def _identify_fire_alarm_pages(self, pages_text: List[PageText]) -> List[int]:
         """Identify which pages contain fire alarm information"""
         
-        fa_pages = []
-        fa_keywords = [
-            'fire alarm', 'fa device', 'smoke detector', 'heat detector',
-            'pull station', 'notification device', 'horn strobe', 'speaker strobe',
-            'fire alarm control', 'facp', 'control panel', 'annunciator',
-            'special systems', 'power plan', 'electrical plan',
-            'life safety plan', 'fire alarm general notes', 'fire alarm riser',
-            'special systems plan', 'fire protection plan'
-        ]
+        fa_pages = set()
         
         for page in pages_text:
-            page_text_lower = page['text'].lower()
+            found = FA_KEYWORDS.find_all_page(page)
             
-            if any(keyword in page_text_lower for keyword in fa_keywords):
-                if 'mounting height' not in page_text_lower or \
-                   'fire alarm' in page_text_lower:
-                    fa_pages.append(page['page_number'])
+            if found - {'mounting height'}:
+                if 'mounting height' not in found or 'fire alarm' in found:
+                    fa_pages.add(page.page_number)
         
-        return sorted(list(set(fa_pages))) # Return unique, sorted list
+        return sorted(fa_pages) # Return unique, sorted list
     
-    def _extract_code_requirements(self, pages_text: List[Dict]) -> Dict[str, List[str]]:
+    async def _extract_code_requirements(self, pages_text: List[PageText],
+                                         front_text: Optional[str] = None) -> Dict[str, List[str]]:
         """Extract applicable codes and standards"""
         
-        code_pages = "\n\n".join([p['text'] for p in pages_text[:10]]) # Look in first 10 pages
+        if front_text is None:
+            front_text = _front_pages_text(pages_text)
+        code_pages = front_text[:10000] # Look in first 10 pages
+        if not has_signal(code_pages):
+            return {}
         
-        prompt = f"""Analyze this construction document and identify all applicable codes and standards.
-
-DOCUMENT TEXT:
-{code_pages[:10000]}
-
-Extract:
-1. BUILDING CODES: (e.g., IBC 2021, CBC, etc.)
-2. FIRE CODES: (e.g., IFC, NFPA codes specific to fire alarm)
-3. ELECTRICAL CODES: (e.g., NEC 2020)
-4. FIRE ALARM STANDARDS: (e.g., NFPA 72, NFPA 101)
-5. LOCAL CODES: Any jurisdiction-specific requirements
-
-Format response as JSON with keys: building_codes, fire_codes, electrical_codes, fire_alarm_standards, local_codes.
-Each should be a list of strings. If none found, use empty list.
-"""
+        prompt = _PROMPT_CODES.substitute(text=code_pages)
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), {})
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, {})
         except Exception as e:
             logger.error(f"Error extracting codes: {str(e)}")
             return {'error': str(e)}
     
-    def _extract_fire_alarm_notes(self, pages_text: List[Dict], fa_pages: List[int]) -> List[Dict[str, str]]:
+    async def _extract_fire_alarm_notes(self, pages_text: List[PageText], fa_pages: List[int],
+                                        fa_text: Optional[str] = None) -> List[Dict[str, str]]:
         """Extract fire alarm general notes from electrical pages"""
         
-        fa_text = "\n\n".join([
-            f"PAGE {p['page_number']}:\n{p['text']}" 
-            for p in pages_text 
-            if p['page_number'] in fa_pages
-        ])
+        if fa_text is None:
+            fa_text = _fa_pages_text(pages_text, fa_pages)
         
         if not fa_text:
             return []
         
-        prompt = f"""Analyze these electrical/fire alarm pages and extract ONLY the PROJECT-SPECIFIC fire alarm notes.
-
-PAGES TEXT:
-{fa_text[:15000]}
-
-Extract fire alarm notes that are:
-✓ Project-specific requirements
-✓ Device quantities or locations
-✓ System specifications
-✓ Special installation requirements
-✓ Coordination notes with other trades
-
-DO NOT extract:
-✗ Standard NFPA mounting heights
-✗ Generic "shall comply with" statements
-✗ Standard distance from walls/ceilings
-✗ Boilerplate code compliance text
-✗ General electrical notes not related to fire alarm
-
-Format as JSON array with objects containing:
-- page: page number
-- note_type: (e.g., "System Requirement", "Device Specification", "Installation Note")
-- content: the actual note text
-
-Example:
-[{{"page": 5, "note_type": "System Requirement", "content": "All devices shall be addressable"}}]
-"""
+        prompt = _PROMPT_FA_NOTES.substitute(text=fa_text)
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), [])
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, [])
         except Exception as e:
             logger.error(f"Error extracting FA notes: {str(e)}")
             return []
     
-    def _extract_mechanical_fa_devices(self, pages_text: List[Dict]) -> Dict[str, List[Dict]]:
+    async def _extract_mechanical_fa_devices(self, pages_text: List[PageText],
+                                             mech_text: Optional[str] = None) -> Dict[str, List[Dict]]:
         """Extract duct detectors and fire/smoke dampers from mechanical pages"""
         
-        mech_pages = []
-        for page in pages_text:
-            page_lower = page['text'].lower()
-            if any(keyword in page_lower for keyword in [
-                'mechanical', 'hvac', 'duct', 'damper', 'air handler', 'rtu', 'ahu'
-            ]):
-                mech_pages.append(page)
+        if mech_text is None:
+            mech_text = _mech_pages_text(pages_text)
         
-        if not mech_pages:
+        if not has_signal(mech_text):
             return {'duct_detectors': [], 'dampers': []}
         
-        mech_text = "\n\n".join([
-            f"PAGE {p['page_number']}:\n{p['text']}" 
-            for p in mech_pages
-        ])
-        
-        prompt = f"""Analyze these mechanical pages and extract fire alarm-related devices.
-
-MECHANICAL PAGES TEXT:
-{mech_text[:15000]}
-
-Extract:
-1. DUCT DETECTORS: Location, type, specifications
-2. FIRE/SMOKE DAMPERS: Location, type, specifications
-
-For each device, extract:
-- page: page number
-- device_type: specific type (e.g., "Duct Smoke Detector", "Fire Damper")
-- location: where it's located (e.g., "RTU-1", "all transfer ducts")
-- quantity: if specified
-- specifications: any specific requirements (e.g., "provide relay to FACP")
-
-Format as JSON with keys:
-- duct_detectors: array of duct detector objects
-- dampers: array of damper objects
-
-Only return devices that require fire alarm integration. Ignore generic HVAC notes or mechanical requirements that do not involve fire alarm monitoring or control. If none found, use empty arrays.
-"""
+        prompt = _PROMPT_MECHANICAL.substitute(text=mech_text)
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), {'duct_detectors': [], 'dampers': []})
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, {'duct_detectors': [], 'dampers': []})
         except Exception as e:
             logger.error(f"Error extracting mechanical devices: {str(e)}")
             return {'duct_detectors': [], 'dampers': [], 'error': str(e)}
     
-    def _extract_specifications(self, pages_text: List[Dict], fa_pages: List[int]) -> Dict[str, Any]:
+    async def _extract_specifications(self, pages_text: List[PageText], fa_pages: List[int],
+                                      fa_text: Optional[str] = None) -> Dict[str, Any]:
         """Extract fire alarm system specifications"""
         
-        fa_text = "\n\n".join([
-            f"PAGE {p['page_number']}:\n{p['text']}" 
-            for p in pages_text 
-            if p['page_number'] in fa_pages
-        ])
+        if fa_text is None:
+            fa_text = _fa_pages_text(pages_text, fa_pages)
         
         if not fa_text:
             return {}
         
-        prompt = f"""Extract fire alarm system specifications from these pages.
-
-FIRE ALARM PAGES:
-{fa_text[:15000]}
-
-Extract:
-1. CONTROL PANEL: Manufacturer, model, features
-2. DEVICES: Types of devices required (smoke, heat, pull stations, etc.)
-3. NOTIFICATION DEVICES: Types (horns, strobes, speakers)
-4. SYSTEM TYPE: (e.g., addressable, conventional, hybrid)
-5. COMMUNICATION: How system communicates (Ethernet, phone line, cellular)
-6. POWER REQUIREMENTS: Backup battery, UPS requirements
-7. MONITORING: Central station monitoring requirements
-8. INTEGRATION: Integration with other systems (access control, BMS, etc.)
-
-Format as JSON with these keys: CONTROL_PANEL, DEVICES, NOTIFICATION_DEVICES, SYSTEM_TYPE, COMMUNICATION, POWER_REQUIREMENTS, MONITORING, INTEGRATION.
-Use null if not found.
-"""
+        prompt = _PROMPT_SPECIFICATIONS.substitute(text=fa_text)
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), {})
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, {})
         except Exception as e:
             logger.error(f"Error extracting specifications: {str(e)}")
             return {'error': str(e)}
\ No newline at end of file
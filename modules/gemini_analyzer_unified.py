@@ -9,27 +9,75 @@ Unified Gemini Analyzer for Fire Alarm Analyzer v6
 """
 
 import os
-import json
-import re
 import logging
+import asyncio
+from string import Template
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from typing import List, Dict, Any
 
-import google.generativeai as genai
+from modules.gemini_client import get_client
+from modules.gemini_text import JSON_RESPONSE_CONFIG, has_signal, join_capped, parse_json
+from modules.keywords import KeywordMatcher
 from modules.pdf_processor import PDFProcessor
-from config import GEMINI_API_KEY, GEMINI_MODEL
+from models import PageText
+from config import GEMINI_API_KEY, GEMINI_MODEL, GEMINI_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
+FA_KEYWORDS = KeywordMatcher([
+    "fire alarm", "special systems", "power plan", "smoke detector",
+    "heat detector", "pull station", "notification", "speaker strobe",
+    "horn strobe", "facp", "annunciator", "relay", "duct detector",
+    "module", "smoke control", "mechanical"
+])
+MECHANICAL_KEYWORDS = KeywordMatcher(["mech"])
+
+_PROMPT_COVER = Template("""
+You are analyzing the cover pages of a construction PDF.
+Extract the following details and return JSON only:
+{
+  "project_name": string,
+  "project_location": string,
+  "project_type": string,
+  "owner": string,
+  "engineer": string,
+  "architect": string,
+  "scope_summary": string
+}
+
+COVER PAGE TEXT:
+$text
+""")
+
+_PROMPT_FA_NOTES = Template("""
+Extract concise bullet points summarizing all fire alarm related notes.
+Return JSON array of strings only.
+TEXT:
+$text
+""")
+
+_PROMPT_MECHANICAL = Template("""
+Identify any mechanical or HVAC devices that interface with the fire alarm system.
+Return a JSON array of objects each like:
+[
+  {"device": "smoke damper", "location": "RTU-3", "action": "supervised"}
+]
+
+TEXT:
+$text
+""")
+
 
 class GeminiAnalyzer:
     """Unified Gemini Analyzer combining old and new features"""
 
     def __init__(self):
         self.model = None
+        self.client = None
         if GEMINI_API_KEY:
             try:
-                genai.configure(api_key=GEMINI_API_KEY)
-                self.model = genai.GenerativeModel(GEMINI_MODEL)
+                self.client = get_client(GEMINI_API_KEY)
+                self.model = self.client.model
                 logger.info(f"✅ Gemini Analyzer initialized with model: {GEMINI_MODEL}")
             except Exception as e:
                 logger.error(f"Failed to initialize Gemini: {e}")
@@ -38,29 +86,10 @@ class GeminiAnalyzer:
 
         self.pdf_processor = PDFProcessor()
 
-    # -------------------------------------------------------------------------
-    # Utility: Robust JSON parser
-    # -------------------------------------------------------------------------
-    @staticmethod
-    def _parse_json(raw_text: str, default: Any) -> Any:
-        """Safely parse JSON from Gemini responses"""
-        if not raw_text:
-            return default
-        cleaned = raw_text.strip()
-        cleaned = re.sub(r"^```(?:json)?", "", cleaned, flags=re.IGNORECASE).strip()
-        cleaned = re.sub(r"```$", "", cleaned).strip()
-        match = re.search(r"\{.*\}|\[.*\]", cleaned, flags=re.DOTALL)
-        json_str = match.group(0) if match else cleaned
-        try:
-            return json.loads(json_str)
-        except Exception as exc:
-            logger.error(f"Failed to parse JSON: {exc}")
-            return default
-
     # -------------------------------------------------------------------------
     # Text extraction pipeline
     # -------------------------------------------------------------------------
-    def extract_pdf_text(self, pdf_path: str) -> List[Dict[str, Any]]:
+    def extract_pdf_text(self, pdf_path: str) -> List[PageText]:
         """Extracts text content from PDF pages"""
         try:
             return self.pdf_processor.extract_text_from_pdf(pdf_path)
@@ -71,20 +100,9 @@ class GeminiAnalyzer:
     # -------------------------------------------------------------------------
     # Fire Alarm Page Identification
     # -------------------------------------------------------------------------
-    def _identify_fire_alarm_pages(self, pages: List[Dict[str, Any]]) -> List[int]:
+    def _identify_fire_alarm_pages(self, pages: List[PageText]) -> List[int]:
         """Identify fire alarm-related pages based on keywords"""
-        fa_keywords = [
-            "fire alarm", "special systems", "power plan", "smoke detector",
-            "heat detector", "pull station", "notification", "speaker strobe",
-            "horn strobe", "facp", "annunciator", "relay", "duct detector",
-            "module", "smoke control", "mechanical"
-        ]
-        fa_pages = []
-        for p in pages:
-            txt = p.get("text", "").lower()
-            if any(k in txt for k in fa_keywords):
-                fa_pages.append(p.get("page_number"))
-        return fa_pages
+        return [p.page_number for p in pages if FA_KEYWORDS.search_page(p)]
 
     # -------------------------------------------------------------------------
     # Gemini Analysis Orchestration
@@ -100,9 +118,12 @@ class GeminiAnalyzer:
 
         try:
             fa_pages = self._identify_fire_alarm_pages(pages)
-            cover_data = self._analyze_cover_pages(pages[:3])
-            fa_notes = self._extract_fa_notes(pages, fa_pages)
-            mechanical = self._extract_mechanical_devices(pages)
+            future = self.client.run(self._run_prompts(pages, fa_pages))
+            try:
+                cover_data, fa_notes, mechanical = future.result(timeout=GEMINI_TIMEOUT)
+            except FutureTimeoutError:
+                future.cancel()
+                raise TimeoutError(f"Gemini analysis timed out after {GEMINI_TIMEOUT}s")
 
             return {
                 "success": True,
@@ -115,31 +136,26 @@ class GeminiAnalyzer:
             logger.error(f"Error in Gemini analysis: {e}", exc_info=True)
             return {"success": False, "error": str(e)}
 
+    async def _run_prompts(self, pages: List[PageText], fa_pages: List[int]):
+        """Issue the independent Gemini prompts concurrently"""
+        return await asyncio.gather(
+            self._analyze_cover_pages(pages[:3]),
+            self._extract_fa_notes(pages, fa_pages),
+            self._extract_mechanical_devices(pages),
+        )
+
     # -------------------------------------------------------------------------
     # Cover Page Extraction
     # -------------------------------------------------------------------------
-    def _analyze_cover_pages(self, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _analyze_cover_pages(self, pages: List[PageText]) -> Dict[str, Any]:
         """Extract high-level project info from cover pages"""
-        text = "\n".join([p.get("text", "") for p in pages])[:15000]
-        prompt = f"""
-You are analyzing the cover pages of a construction PDF.
-Extract the following details and return JSON only:
-{{
-  "project_name": string,
-  "project_location": string,
-  "project_type": string,
-  "owner": string,
-  "engineer": string,
-  "architect": string,
-  "scope_summary": string
-}}
-
-COVER PAGE TEXT:
-{text}
-"""
+        text = join_capped((p.text for p in pages), 15000, sep="\n")
+        if not has_signal(text):
+            return {}
+        prompt = _PROMPT_COVER.substitute(text=text)
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), {})
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, {})
         except Exception as e:
             logger.error(f"Error extracting project info: {e}")
             return {}
@@ -147,20 +163,15 @@ COVER PAGE TEXT:
     # -------------------------------------------------------------------------
     # FA Notes Extraction
     # -------------------------------------------------------------------------
-    def _extract_fa_notes(self, pages: List[Dict[str, Any]], fa_pages: List[int]) -> List[str]:
+    async def _extract_fa_notes(self, pages: List[PageText], fa_pages: List[int]) -> List[str]:
         """Extract relevant FA notes from identified pages"""
-        joined = "\n".join(
-            [pages[i - 1]["text"] for i in fa_pages if i - 1 < len(pages)]
-        )[:30000]
-        prompt = f"""
-Extract concise bullet points summarizing all fire alarm related notes.
-Return JSON array of strings only.
-TEXT:
-{joined}
-"""
+        joined = join_capped(
+            (pages[i - 1].text for i in fa_pages if i - 1 < len(pages)), 30000, sep="\n"
+        )
+        prompt = _PROMPT_FA_NOTES.substitute(text=joined)
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), [])
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, [])
         except Exception as e:
             logger.error(f"Error extracting FA notes: {e}")
             return []
@@ -168,22 +179,17 @@ TEXT:
     # -------------------------------------------------------------------------
     # Mechanical / FA Device Extraction
     # -------------------------------------------------------------------------
-    def _extract_mechanical_devices(self, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    async def _extract_mechanical_devices(self, pages: List[PageText]) -> List[Dict[str, Any]]:
         """Extract mechanical system references related to FA integration"""
-        mech_text = "\n".join([p["text"] for p in pages if "mech" in p.get("text", "").lower()])
-        prompt = f"""
-Identify any mechanical or HVAC devices that interface with the fire alarm system.
-Return a JSON array of objects each like:
-[
-  {{"device": "smoke damper", "location": "RTU-3", "action": "supervised"}}
-]
-
-TEXT:
-{mech_text}
-"""
+        mech_text = join_capped(
+            (p.text for p in pages if MECHANICAL_KEYWORDS.search_page(p)), 30000, sep="\n"
+        )
+        if not has_signal(mech_text):
+            return []
+        prompt = _PROMPT_MECHANICAL.substitute(text=mech_text)
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_json(getattr(response, "text", ""), [])
+            response_text = await self.client.generate(prompt, generation_config=JSON_RESPONSE_CONFIG)
+            return parse_json(response_text, [])
         except Exception as e:
             logger.error(f"Error extracting mechanical devices: {e}")
             return []
@@ -0,0 +1,95 @@
+"""
+Gemini Client Module - Shared asyncio loop for non-blocking Gemini calls
+"""
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Awaitable
+
+import google.generativeai as genai
+
+from config import GEMINI_MAX_CONCURRENCY, GEMINI_MODEL
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncGeminiClient:
+    """
+    Runs Gemini requests on one background event loop.
+
+    Every request thread hands its coroutines to the same loop, so calls from
+    different analyses overlap instead of each holding a worker thread while
+    it waits on the network. A semaphore caps how many calls are in flight.
+    """
+
+    def __init__(self, model, max_concurrency: int = GEMINI_MAX_CONCURRENCY):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._loop_pid = None
+        self._semaphore = None
+
+    async def generate(self, prompt: str, **kwargs) -> str:
+        """
+        Send one prompt to Gemini and return the response text
+
+        Extra keyword arguments (e.g. ``generation_config``) are passed to
+        ``generate_content_async``. Must be awaited on this client's loop
+        (i.e. from a coroutine passed to ``run``).
+        """
+        async with self._semaphore:
+            response = await self.model.generate_content_async(prompt, **kwargs)
+        return getattr(response, "text", "")
+
+    def submit(self, prompt: str, **kwargs) -> Future:
+        """Queue a single prompt; the returned future resolves to the response text"""
+        return self.run(self.generate(prompt, **kwargs))
+
+    def run(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the client loop and return a concurrent future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread lazily; threads do not survive a gunicorn fork."""
+        pid = os.getpid()
+        with self._lock:
+            if self._loop is not None and self._loop_pid == pid:
+                return self._loop
+
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                ready.set()
+                loop.run_forever()
+
+            threading.Thread(target=run_loop, name='gemini-loop', daemon=True).start()
+            ready.wait()
+            self._loop = loop
+            self._loop_pid = pid
+            logger.info(f"Gemini client loop started (max_concurrency={self.max_concurrency})")
+            return loop
+
+
+@lru_cache(maxsize=4)
+def get_model(api_key: str, model_name: str = GEMINI_MODEL):
+    """
+    Return the process-wide GenerativeModel for an API key
+
+    Configuring the SDK and creating the model once lets every analyzer share
+    the same underlying connection instead of setting up a new one each time.
+    """
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+@lru_cache(maxsize=4)
+def get_client(api_key: str, model_name: str = GEMINI_MODEL) -> AsyncGeminiClient:
+    """Return the process-wide AsyncGeminiClient for an API key"""
+    return AsyncGeminiClient(get_model(api_key, model_name))
@@ -0,0 +1,112 @@
+"""
+Gemini Text Module - Prompt text helpers and response JSON parsing shared by the Gemini analyzers
+"""
+import json
+import logging
+import re
+from typing import Any, Iterable, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Ask Gemini for a bare JSON body so responses normally parse without cleanup
+JSON_RESPONSE_CONFIG = {"response_mime_type": "application/json"}
+
+# Patterns used to pull JSON out of Gemini responses
+_FENCE_HEAD = re.compile(r"^```(?:json)?", re.IGNORECASE | re.MULTILINE)
+_FENCE_TAIL = re.compile(r"```$", re.MULTILINE)
+_TRAILING_COMMA = re.compile(r",\s*([\]\}])")
+
+# Roughly four characters per token; below this the front pages of a scanned
+# (un-OCR'd) set carry no usable signal and the Gemini call is skipped.
+_MIN_SOURCE_TOKENS = 50
+
+
+def _loads(json_str: str) -> Any:
+    """Parse JSON with orjson when installed"""
+    return orjson.loads(json_str) if orjson else json.loads(json_str)
+
+
+def json_body(text: str) -> Optional[str]:
+    """
+    Return the span from the first ``{``/``[`` to the last matching closer
+
+    Equivalent to searching for ``\\{.*\\}|\\[.*\\]`` with DOTALL, using plain
+    index scans instead of a greedy regex over the whole response.
+    """
+    candidates = sorted(
+        (start, closer)
+        for start, closer in ((text.find('{'), '}'), (text.find('['), ']'))
+        if start != -1
+    )
+    for start, closer in candidates:
+        end = text.rfind(closer)
+        if end > start:
+            return text[start:end + 1]
+    return None
+
+
+def join_capped(texts: Iterable[str], cap: int, sep: str = "\n\n") -> str:
+    """
+    Same result as ``sep.join(texts)[:cap]``, but stops consuming ``texts``
+    once the cap is reached instead of building the full concatenation.
+    """
+    parts = []
+    remaining = cap
+    for index, text in enumerate(texts):
+        if index:
+            parts.append(sep[:remaining])
+            remaining -= len(sep)
+        # Only the part of each page that fits is kept, so the final join
+        # never copies more than ``cap`` characters.
+        parts.append(text[:max(remaining, 0)])
+        remaining -= len(text)
+        if remaining <= 0:
+            break
+    return "".join(parts)
+
+
+def has_signal(text: str) -> bool:
+    """True if text is long enough to be worth sending to Gemini"""
+    return len(text.strip()) // 4 >= _MIN_SOURCE_TOKENS
+
+
+def parse_json(raw_text: str, default: Any) -> Any:
+    """Safely parse JSON from Gemini responses"""
+    if not raw_text:
+        return default
+
+    # JSON mode responses are a bare JSON body; only fall back to the
+    # cleanup below for prose or fenced replies.
+    try:
+        parsed = _loads(raw_text)
+        if isinstance(parsed, (dict, list)):
+            return parsed
+    except ValueError:
+        pass
+
+    # Clean up markdown code blocks
+    cleaned = _FENCE_HEAD.sub("", raw_text.strip())
+    cleaned = _FENCE_TAIL.sub("", cleaned.strip())
+
+    # Find the first valid JSON object or array
+    json_str = json_body(cleaned)
+    if json_str is None:
+        logger.warning(f"No JSON object or array found in Gemini response: {cleaned}")
+        return default
+
+    try:
+        return _loads(json_str)
+    except ValueError as exc:  # json/orjson decode errors subclass ValueError
+        logger.error(f"Failed to parse JSON: {exc}. Raw string was: {json_str}")
+        # Try to fix common issues like trailing commas
+        json_str = _TRAILING_COMMA.sub(r"\1", json_str)
+        try:
+            return _loads(json_str)
+        except Exception:
+            logger.error("Failed to parse JSON even after attempting fixes.")
+            return default
@@ -0,0 +1,81 @@
+"""
+Keyword Matching Module - Single-pass multi-keyword search over page text
+"""
+import re
+from typing import Iterable, Set
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - optional dependency
+    ahocorasick = None
+
+from models import PageText
+
+
+def folded_page_text(page: PageText) -> str:
+    """
+    Casefolded text of a page, computed once and stored on the page
+
+    Several keyword scans run over the same pages; caching the folded copy
+    means each page's text is lowered once rather than once per scan.
+    """
+    folded = page.text_folded
+    if folded is None:
+        folded = page.text_folded = page.text.casefold()
+    return folded
+
+
+class KeywordMatcher:
+    """
+    Finds which of a fixed set of keywords occur in a text in one pass.
+
+    Uses an Aho-Corasick automaton (pyahocorasick) over casefolded text when
+    available. Otherwise a single compiled case-insensitive alternation regex
+    runs directly on the original text, so no lowered copy is made at all.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(dict.fromkeys(keyword.casefold() for keyword in keywords))
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+            self._pattern = None
+        else:
+            self._automaton = None
+            # Lookahead so matches starting inside an earlier match are still found
+            alternatives = sorted(self.keywords, key=len, reverse=True)
+            self._pattern = re.compile("(?=(" + "|".join(map(re.escape, alternatives)) + "))",
+                                       re.IGNORECASE)
+
+    def search(self, text: str) -> bool:
+        """Return True if any keyword occurs in the text"""
+        if self._automaton is None:
+            return self._pattern.search(text) is not None
+        return next(self._automaton.iter(text.casefold()), None) is not None
+
+    def search_page(self, page: PageText) -> bool:
+        """Return True if any keyword occurs in a page's text"""
+        if self._automaton is None:
+            return self.search(page.text)
+        return next(self._automaton.iter(folded_page_text(page)), None) is not None
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return the set of keywords that occur in the text"""
+        if self._automaton is None:
+            return self._find_all_regex(text)
+        return {keyword for _, keyword in self._automaton.iter(text.casefold())}
+
+    def find_all_page(self, page: PageText) -> Set[str]:
+        """Return the set of keywords that occur in a page's text"""
+        if self._automaton is None:
+            return self._find_all_regex(page.text)
+        return {keyword for _, keyword in self._automaton.iter(folded_page_text(page))}
+
+    def _find_all_regex(self, text: str) -> Set[str]:
+        found = {match.group(1).casefold() for match in self._pattern.finditer(text)}
+        # The regex reports one keyword per start position; shorter keywords
+        # at the same position are substrings of the one it picked.
+        return {keyword for keyword in self.keywords if any(keyword in hit for hit in found)}
@@ -0,0 +1,87 @@
+"""
+NMS Module - Greedy per-class non-maximum suppression over box arrays
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _nms_numba(corners, areas, classes, order, iou_threshold):
+        count = order.shape[0]
+        suppressed = np.zeros(count, dtype=np.bool_)
+        keep = np.empty(count, dtype=np.int64)
+        kept = 0
+        for i in range(count):
+            a = order[i]
+            if suppressed[a]:
+                continue
+            keep[kept] = a
+            kept += 1
+            for j in range(i + 1, count):
+                b = order[j]
+                if suppressed[b] or classes[b] != classes[a]:
+                    continue
+                x1 = max(corners[a, 0], corners[b, 0])
+                y1 = max(corners[a, 1], corners[b, 1])
+                x2 = min(corners[a, 2], corners[b, 2])
+                y2 = min(corners[a, 3], corners[b, 3])
+                if x2 < x1 or y2 < y1:
+                    continue
+                intersection = (x2 - x1) * (y2 - y1)
+                union = areas[a] + areas[b] - intersection
+                if union > 0 and intersection / union > iou_threshold:
+                    suppressed[b] = True
+        return keep[:kept]
+
+
+def _nms_numpy(corners, areas, classes, order, iou_threshold):
+    remaining = order
+    keep = []
+    while remaining.size:
+        a = remaining[0]
+        keep.append(a)
+        rest = remaining[1:]
+        x1 = np.maximum(corners[a, 0], corners[rest, 0])
+        y1 = np.maximum(corners[a, 1], corners[rest, 1])
+        x2 = np.minimum(corners[a, 2], corners[rest, 2])
+        y2 = np.minimum(corners[a, 3], corners[rest, 3])
+        intersection = np.where((x2 < x1) | (y2 < y1), 0.0, (x2 - x1) * (y2 - y1))
+        union = areas[a] + areas[rest] - intersection
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = np.where(union > 0, intersection / union, 0.0)
+        remaining = rest[(classes[rest] != classes[a]) | (iou <= iou_threshold)]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray,
+        iou_threshold: float = 0.5) -> np.ndarray:
+    """
+    Indices of the boxes kept by greedy NMS, highest score first
+
+    A box is dropped when its IoU with a higher-scoring kept box of the same
+    class exceeds ``iou_threshold``. Ties keep their input order.
+
+    Args:
+        boxes: (N, 4) float64 array of center-format [x, y, width, height]
+        scores: (N,) confidences
+        classes: (N,) integer class codes
+        iou_threshold: IoU above which a box counts as a duplicate
+
+    Returns:
+        int64 array of kept indices into ``boxes``
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    half_sizes = boxes[:, 2:] / 2
+    corners = np.hstack((boxes[:, :2] - half_sizes, boxes[:, :2] + half_sizes))
+    areas = boxes[:, 2] * boxes[:, 3]
+    classes = np.asarray(classes, dtype=np.int64)
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+
+    if njit is not None:
+        return _nms_numba(corners, areas, classes, order, float(iou_threshold))
+    return _nms_numpy(corners, areas, classes, order, iou_threshold)
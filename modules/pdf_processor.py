@@ -2,26 +2,260 @@
 PDF Processing Module - Handles PDF to image conversion and tiling
 """
 import logging
-from typing import List, Tuple, Dict
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, wraps
+from itertools import islice, repeat
+from multiprocessing import resource_tracker, shared_memory
+from typing import Iterator, List, Tuple, Dict, Optional
 import fitz  # PyMuPDF
 from PIL import Image
 import numpy as np
 
 from config import DPI, TILE_SIZE, OVERLAP_PERCENT
+from models import PageText
 
 logger = logging.getLogger(__name__)
 
+# CPUs available before a gunicorn worker pinned itself to a slice of them.
+# The render pool gets them all back: it renders for the whole worker, and
+# inheriting a one- or two-core mask would serialize its processes.
+_PROCESS_CPUS = os.sched_getaffinity(0) if hasattr(os, 'sched_getaffinity') else None
+
+# Document opened by the current render-pool worker, reused across its pages.
+# It is keyed on the file's identity, not just its path, and closed once the
+# worker has been idle for _WORKER_DOC_IDLE seconds: analysis temp dirs are
+# deleted right after a job, and an idle worker would otherwise keep the
+# deleted PDF (its disk space and file descriptor) alive indefinitely.
+_WORKER_DOC_IDLE = 5.0
+_worker_doc_key: Optional[Tuple[str, int, int, int]] = None
+_worker_doc = None
+_worker_doc_lock = threading.Lock()
+_worker_doc_generation = 0
+_worker_doc_timer: Optional[threading.Timer] = None
+
+
+@lru_cache(maxsize=8)
+def _render_matrix(dpi: int) -> fitz.Matrix:
+    """Scale matrix for a DPI, built once and shared by every page render"""
+    return fitz.Matrix(dpi / 72, dpi / 72)
+
+
+def _render_pixmap(page, page_num: int, dpi: int) -> Optional[fitz.Pixmap]:
+    """
+    Render a single page to an RGB pixmap (no alpha)
+    
+    Callers read ``pix.samples_mv`` while they still hold the pixmap; the
+    memoryview does not keep the pixmap alive on its own.
+    
+    Returns:
+        Pixmap or None if the page could not be rendered
+    """
+    try:
+        # Get page size and validate
+        page_size = page.rect.width * page.rect.height
+        if page_size == 0:
+            logger.warning(f"Page {page_num + 1} has zero size, skipping")
+            return None
+        
+        pix = page.get_pixmap(matrix=_render_matrix(dpi), colorspace=fitz.csRGB, alpha=False)
+        if not pix or pix.width == 0 or pix.height == 0:
+            logger.warning(f"Invalid pixmap on page {page_num + 1}, skipping")
+            return None
+        
+        return pix
+    except Exception as render_err:
+        logger.error(f"Error rendering page {page_num + 1}: {str(render_err)}")
+        return None
+
+
+def _pixmap_size(page, dpi: int) -> Tuple[int, int]:
+    """Width and height of the pixmap get_pixmap() will produce at this DPI"""
+    rect = (page.rect * _render_matrix(dpi)).irect
+    return rect.width, rect.height
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block owned by the parent without registering it for cleanup here"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    
+    # Older Pythons register attached blocks with the resource tracker, which
+    # would unlink the parent's block (or warn) when this worker exits.
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _release_affinity(cpus):
+    """Render-pool initializer: undo the CPU pinning inherited from the web worker"""
+    if not cpus:
+        return
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as affinity_err:
+        logger.debug(f"Could not widen render worker CPU affinity: {affinity_err}")
+
+
+def _close_worker_doc():
+    """Close the worker's cached document, if any"""
+    global _worker_doc_key, _worker_doc
+    
+    if _worker_doc is not None:
+        _worker_doc.close()
+    _worker_doc = None
+    _worker_doc_key = None
+
+
+def _close_idle_worker_doc(generation: int):
+    """Idle timer callback: close the document unless a task has started since"""
+    with _worker_doc_lock:
+        if generation == _worker_doc_generation:
+            _close_worker_doc()
+
+
+def _uses_worker_doc(func):
+    """
+    Mark a render-pool entry point as using the worker's cached document
+    
+    The idle timer is stopped while the task runs and restarted when it ends.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _worker_doc_generation, _worker_doc_timer
+        
+        with _worker_doc_lock:
+            _worker_doc_generation += 1
+            if _worker_doc_timer is not None:
+                _worker_doc_timer.cancel()
+                _worker_doc_timer = None
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with _worker_doc_lock:
+                if _worker_doc is not None:
+                    _worker_doc_timer = threading.Timer(_WORKER_DOC_IDLE, _close_idle_worker_doc,
+                                                        args=(_worker_doc_generation,))
+                    _worker_doc_timer.daemon = True
+                    _worker_doc_timer.start()
+    return wrapper
+
+
+def _worker_page(pdf_path: str, page_num: int):
+    """Load a page from the worker's open document, reopening only when the file changes"""
+    global _worker_doc_key, _worker_doc
+    
+    try:
+        stat = os.stat(pdf_path)
+    except OSError as stat_err:
+        # The job's temp dir is gone; let go of its document too
+        _close_worker_doc()
+        logger.error(f"Error processing page {page_num + 1}: {str(stat_err)}")
+        return None
+    
+    try:
+        key = (pdf_path, stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+        if _worker_doc_key != key:
+            _close_worker_doc()
+            _worker_doc = fitz.open(pdf_path)
+            _worker_doc_key = key
+        return _worker_doc[page_num]
+    except Exception as page_err:
+        logger.error(f"Error processing page {page_num + 1}: {str(page_err)}")
+        return None
+
+
+@_uses_worker_doc
+def _render_thumbnail_from_path(pdf_path: str, page_num: int, size: int) -> Optional[bytes]:
+    """
+    Render-pool entry point: rasterize one page at thumbnail size as JPEG
+    
+    The longest side comes out at ``size`` pixels. Encoding happens in the
+    worker too, so only the few KB of JPEG travel back.
+    """
+    page = _worker_page(pdf_path, page_num)
+    if page is None:
+        return None
+    
+    try:
+        longest = max(page.rect.width, page.rect.height)
+        if longest <= 0:
+            logger.warning(f"Page {page_num + 1} has zero size, skipping")
+            return None
+        
+        scale = size / longest
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), colorspace=fitz.csRGB, alpha=False)
+        return pix.tobytes("jpeg", jpg_quality=85)
+    except Exception as render_err:
+        logger.error(f"Error rendering thumbnail for page {page_num + 1}: {str(render_err)}")
+        return None
+
+
+@_uses_worker_doc
+def _render_page_from_path(pdf_path: str, page_num: int, dpi: int,
+                           shm_name: Optional[str] = None) -> Optional[Tuple[int, int, Optional[bytes]]]:
+    """
+    Render-pool entry point: open the PDF once per worker and render one page
+    
+    When ``shm_name`` is given, the samples are written into that shared memory
+    block and ``(width, height, None)`` is returned, so the page never goes
+    through pickle. Otherwise the samples are returned directly.
+    """
+    page = _worker_page(pdf_path, page_num)
+    if page is None:
+        return None
+    
+    pix = _render_pixmap(page, page_num, dpi)
+    if pix is None:
+        return None
+    if shm_name is None:
+        return pix.width, pix.height, pix.samples
+    
+    data = pix.samples_mv
+    shm = _attach_shared_memory(shm_name)
+    try:
+        if shm.size < len(data):
+            # Size estimate was off; fall back to returning the bytes.
+            return pix.width, pix.height, pix.samples
+        shm.buf[:len(data)] = data
+    finally:
+        shm.close()
+    return pix.width, pix.height, None
+
 
 class PDFProcessor:
     """Handles PDF to image conversion and optimized tiling"""
     
-    def __init__(self, dpi: int = DPI):
+    def __init__(self, dpi: int = DPI, render_workers: int = 1):
         self.dpi = dpi
+        # Optional ResultCache for rendered pages
+        self.cache = None
+        self.render_workers = render_workers
+        self._render_pool = None
+        self._render_pool_pid = None
+        self._render_pool_lock = threading.Lock()
+
     def extract_text_from_pdf(self, pdf_source):
         """
         Extract text content from each PDF page.
         Accepts either a filesystem path or raw PDF bytes.
+        Results for paths are cached on the file hash when a cache is set.
         """
+        file_hash = None
+        if self.cache and isinstance(pdf_source, str):
+            file_hash = self.cache.hash_file(pdf_source)
+            cached_pages = self.cache.get_text(file_hash)
+            if cached_pages is not None:
+                logger.info(f"Using cached text for {len(cached_pages)} pages")
+                return cached_pages
+
         try:
             # Determine whether it's a path or a file-like/bytes object
             if isinstance(pdf_source, (bytes, bytearray)):
@@ -35,11 +269,10 @@ class PDFProcessor:
 
             pages = []
             for i, page in enumerate(doc, start=1):
-                pages.append({
-                    "page_number": i,
-                    "text": page.get_text()
-                })
+                pages.append(PageText(page_number=i, text=page.get_text()))
             doc.close()
+            if file_hash and pages:
+                self.cache.set_text(file_hash, pages)
             return pages
 
         except Exception as e:
@@ -57,11 +290,42 @@ class PDFProcessor:
         Returns:
             List of PIL Image objects
         """
+        images = [image for _, image in self.iter_pages(pdf_path, selected_pages)]
+        logger.info(f"Successfully converted {len(images)} pages")
+        return images
+    
+    def iter_pages(self, pdf_path: str, selected_pages: List[int] = None,
+                   dpi: Optional[int] = None) -> Iterator[Tuple[int, Image.Image]]:
+        """
+        Render PDF pages one at a time
+        
+        Pages are rendered ahead only as far as the render pool has workers,
+        so a caller that finishes with each page before asking for the next
+        holds about one page in memory regardless of document length.
+        
+        Args:
+            pdf_path: Path to PDF file
+            selected_pages: Optional list of page numbers to process (1-indexed)
+            dpi: Render resolution; defaults to self.dpi
+        
+        Yields:
+            (page_number, image) tuples in page order, page numbers 1-indexed
+        """
+        # Started before the document is opened so new workers do not
+        # inherit (and keep alive) its file descriptor
+        render_pool = self._get_render_pool()
         try:
             logger.info(f"Opening PDF: {pdf_path}")
             doc = fitz.open(pdf_path)
+        except Exception as e:
+            logger.error(f"Error converting PDF to images: {str(e)}", exc_info=True)
+            return
+        
+        dpi = dpi or self.dpi
+        samples = None
+        try:
             total_pages = len(doc)
-            images = []
+            file_hash = self.cache.hash_file(pdf_path) if self.cache else None
             
             # Determine which pages to process
             if selected_pages:
@@ -71,70 +335,198 @@ class PDFProcessor:
                 pages_to_process = range(total_pages)
                 logger.info(f"Processing all {total_pages} pages")
             
+            cached_pages = set()
+            if file_hash:
+                cached_pages = {p for p in pages_to_process
+                                if self.cache.has_page(file_hash, p + 1, dpi)}
+            pages_to_render = [p for p in pages_to_process if p not in cached_pages]
+            
+            # Rasterization is CPU bound, so spread multi-page renders over processes
+            if render_pool is not None and len(pages_to_render) > 1:
+                samples = self._render_in_pool(render_pool, doc, pdf_path, pages_to_render, dpi)
+            else:
+                samples = self._render_sequential(doc, pages_to_render, dpi)
+            
             for page_num in pages_to_process:
-                try:
-                    page = doc[page_num]
-                    logger.info(f"Processing page {page_num + 1}/{total_pages}")
-                    
-                    # Get page size and validate
-                    page_size = page.rect.width * page.rect.height
-                    if page_size == 0:
-                        logger.warning(f"Page {page_num + 1} has zero size, skipping")
+                if page_num in cached_pages:
+                    cached_image = self.cache.get_page(file_hash, page_num + 1, dpi)
+                    if cached_image is not None:
+                        logger.info(f"Using cached render for page {page_num + 1}/{total_pages}")
+                        yield page_num + 1, cached_image
                         continue
-                    
-                    # Render page to image
-                    mat = fitz.Matrix(self.dpi / 72, self.dpi / 72)
-                    try:
-                        pix = page.get_pixmap(matrix=mat)
-                        if not pix or pix.width == 0 or pix.height == 0:
-                            logger.warning(f"Invalid pixmap on page {page_num + 1}, skipping")
-                            continue
-                        
-                        # Convert to PIL Image
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        images.append(img)
-                        logger.info(f"Successfully processed page {page_num + 1} ({img.width}x{img.height})")
-                    except Exception as render_err:
-                        logger.error(f"Error rendering page {page_num + 1}: {str(render_err)}")
-                        continue
-                except Exception as page_err:
-                    logger.error(f"Error processing page {page_num + 1}: {str(page_err)}")
+                    # The cache entry turned out to be unreadable; render it here
+                    sample = next(self._render_sequential(doc, [page_num], dpi))
+                else:
+                    sample = next(samples)
+                
+                if sample is None:
                     continue
-            
-            doc.close()
-            logger.info(f"Successfully converted {len(images)} pages")
-            return images
+                width, height, data = sample
+                img = Image.frombytes("RGB", [width, height], data)
+                if file_hash:
+                    self.cache.set_page(file_hash, page_num + 1, dpi, img)
+                logger.info(f"Successfully processed page {page_num + 1} ({img.width}x{img.height})")
+                yield page_num + 1, img
             
         except Exception as e:
             logger.error(f"Error converting PDF to images: {str(e)}", exc_info=True)
-            return []
+        finally:
+            if samples is not None:
+                samples.close()
+            doc.close()
+    
+    def iter_thumbnails(self, pdf_path: str, page_numbers: List[int],
+                        size: int) -> Iterator[Tuple[int, Optional[bytes]]]:
+        """
+        Render JPEG thumbnails whose longest side is ``size`` pixels
+        
+        Pages are spread over the render pool when there is one.
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_numbers: Page numbers to render (1-indexed)
+            size: Longest thumbnail side in pixels
+        
+        Yields:
+            (page_number, JPEG bytes) in order; bytes are None if rendering failed
+        """
+        indices = [page_number - 1 for page_number in page_numbers]
+        render_pool = self._get_render_pool() if len(indices) > 1 else None
+        if render_pool is not None:
+            thumbnails = render_pool.map(_render_thumbnail_from_path, repeat(pdf_path), indices, repeat(size))
+        else:
+            thumbnails = map(_render_thumbnail_from_path, repeat(pdf_path), indices, repeat(size))
+        yield from zip(page_numbers, thumbnails)
+    
+    def _render_sequential(self, doc, pages_to_render: List[int], dpi: int):
+        """
+        Render pages in this process
+        
+        Yields (width, height, samples memoryview) per page in order, or None on
+        failure. Each view is only valid until the next item is requested.
+        """
+        for page_num in pages_to_render:
+            pix = _render_pixmap(doc[page_num], page_num, dpi)
+            if pix is None:
+                yield None
+                continue
+            yield pix.width, pix.height, pix.samples_mv
+            del pix
+    
+    def _render_in_pool(self, render_pool: ProcessPoolExecutor, doc, pdf_path: str,
+                        pages_to_render: List[int], dpi: int):
+        """
+        Render pages in the pool, passing samples back through shared memory
+        
+        Yields (width, height, buffer) per page in order, or None on failure.
+        Each buffer is only valid until the next item is requested.
+        """
+        blocks = {}
+        in_flight = deque()
+        pending_pages = iter(pages_to_render)
+        
+        def submit_next():
+            for page_num in islice(pending_pages, 1):
+                width, height = _pixmap_size(doc[page_num], dpi)
+                shm_name = None
+                if width > 0 and height > 0:
+                    shm = shared_memory.SharedMemory(create=True, size=width * height * 3)
+                    blocks[page_num] = shm
+                    shm_name = shm.name
+                in_flight.append((page_num, render_pool.submit(_render_page_from_path, pdf_path,
+                                                               page_num, dpi, shm_name)))
+        
+        try:
+            # Keep only as many pages in flight as there are workers, so shared
+            # memory is held for a few pages rather than the whole document.
+            for _ in range(self.render_workers):
+                submit_next()
+            
+            while in_flight:
+                page_num, future = in_flight.popleft()
+                sample = future.result()
+                submit_next()
+                shm = blocks.pop(page_num, None)
+                try:
+                    if sample is None or sample[2] is not None:
+                        yield sample
+                        continue
+                    
+                    width, height, _ = sample
+                    view = shm.buf[:width * height * 3]
+                    try:
+                        yield width, height, view
+                    finally:
+                        view.release()
+                finally:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+            for shm in blocks.values():
+                shm.close()
+                shm.unlink()
+    
+    def _get_render_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Return this process's render pool, creating it on first use.
+
+        The pool is created lazily per PID so gunicorn workers forked from a
+        preloaded master never share the master's pool queues. Its workers
+        are forked right away rather than on the first task, which usually
+        arrives while a document is open here.
+        """
+        if self.render_workers <= 1:
+            return None
+        
+        pid = os.getpid()
+        with self._render_pool_lock:
+            if self._render_pool is None or self._render_pool_pid != pid:
+                self._render_pool = ProcessPoolExecutor(max_workers=self.render_workers,
+                                                        initializer=_release_affinity,
+                                                        initargs=(_PROCESS_CPUS,))
+                self._render_pool.submit(os.getpid).result()
+                self._render_pool_pid = pid
+            return self._render_pool
+    
+    @staticmethod
+    def _to_gray_array(tile_image) -> np.ndarray:
+        """Return a grayscale uint8 array for a PIL tile or an already-gray array"""
+        if isinstance(tile_image, Image.Image):
+            return np.asarray(tile_image.convert('L'))
+        return tile_image
     
     @staticmethod
-    def is_blank_tile(tile_image: Image.Image, threshold: float = 0.95, 
+    def is_blank_tile(tile_image, threshold: float = 0.95,
                      variance_threshold: float = 100) -> bool:
         """
         Check if a tile is mostly blank/empty
         
         Args:
-            tile_image: PIL Image tile
+            tile_image: PIL Image tile or grayscale uint8 array
             threshold: White pixel ratio threshold
             variance_threshold: Variance threshold for uniformity
         
         Returns:
             True if tile is blank
         """
-        gray = tile_image.convert('L')
-        np_img = np.array(gray)
+        np_img = PDFProcessor._to_gray_array(tile_image)
         
         # Check white pixel ratio
-        white_pixels = np.sum(np_img > 240)
+        white_pixels = np.count_nonzero(np_img > 240)
         total_pixels = np_img.size
         white_ratio = white_pixels / total_pixels
+        if white_ratio > threshold:
+            return True
         
-        # Check variance (low variance = uniform/blank content)
-        variance = np.var(np_img)
+        # Check variance (low variance = uniform/blank content). Integer sums
+        # avoid np.var's float64 copy of the tile and give the same value.
+        total = int(np_img.sum(dtype=np.int64))
+        squares = int(np.square(np_img, dtype=np.uint16).sum(dtype=np.int64))
+        variance = (squares * total_pixels - total * total) / (total_pixels * total_pixels)
         
-        return white_ratio > threshold or variance < variance_threshold
+        return variance < variance_threshold
     
     @staticmethod
     def is_edge_tile(x: int, y: int, tile_size: int, img_width: int, 
@@ -157,19 +549,18 @@ class PDFProcessor:
                 y + tile_size > img_height - margin)
     
     @staticmethod
-    def calculate_tile_complexity(tile_image: Image.Image) -> float:
+    def calculate_tile_complexity(tile_image) -> float:
         """
         Calculate complexity score for a tile
         Higher score = more content/edges = more likely to contain objects
         
         Args:
-            tile_image: PIL Image tile
+            tile_image: PIL Image tile or grayscale uint8 array
         
         Returns:
             Complexity score (float)
         """
-        gray = tile_image.convert('L')
-        np_img = np.array(gray)
+        np_img = PDFProcessor._to_gray_array(tile_image)
         
         # Use edge detection as proxy for content complexity
         edges_h = np.abs(np.diff(np_img, axis=0)).sum()
@@ -178,6 +569,123 @@ class PDFProcessor:
         
         return edges / np_img.size
     
+    @staticmethod
+    def tile_offsets(img_width: int, img_height: int, tile_size: int = TILE_SIZE,
+                     overlap: float = OVERLAP_PERCENT) -> np.ndarray:
+        """
+        Compute the (x, y) offset of every tile on a page
+        
+        Order matches the grid walk: main grid row by row, then the right edge
+        column, the bottom edge row and the bottom-right corner for pages whose
+        size is not a multiple of the stride.
+        
+        Returns:
+            (N, 2) int array of (x, y) offsets
+        """
+        stride = int(tile_size * (1 - overlap))
+        xs = np.arange(0, img_width - tile_size + 1, stride)
+        ys = np.arange(0, img_height - tile_size + 1, stride)
+        right_x = img_width - tile_size
+        bottom_y = img_height - tile_size
+        
+        grid_y, grid_x = np.meshgrid(ys, xs, indexing='ij')
+        parts = [np.stack([grid_x.ravel(), grid_y.ravel()], axis=1)]
+        if img_width % stride != 0:
+            parts.append(np.stack([np.full_like(ys, right_x), ys], axis=1))
+        if img_height % stride != 0:
+            parts.append(np.stack([xs, np.full_like(xs, bottom_y)], axis=1))
+        if img_width % stride != 0 and img_height % stride != 0:
+            parts.append(np.array([[right_x, bottom_y]]))
+        
+        offsets = np.concatenate(parts).astype(np.int64)
+        # Pages smaller than a tile get a single tile at the origin.
+        return np.maximum(offsets, 0).reshape(-1, 2)
+    
+    @staticmethod
+    def _pad_to_tile(page: np.ndarray, tile_size: int) -> np.ndarray:
+        """Pad pages smaller than one tile with black, like PIL's out-of-bounds crop"""
+        pad_h = max(0, tile_size - page.shape[0])
+        pad_w = max(0, tile_size - page.shape[1])
+        if not pad_h and not pad_w:
+            return page
+        padding = [(0, pad_h), (0, pad_w)] + [(0, 0)] * (page.ndim - 2)
+        return np.pad(page, padding)
+    
+    @staticmethod
+    def _box_sums(values, height: int, width: int, xs: np.ndarray, ys: np.ndarray,
+                  page_height: int) -> np.ndarray:
+        """
+        Sum a per-pixel quantity over every (y, x) box of the given size
+        
+        The page is split into horizontal bands at every box top and bottom,
+        and each band is reduced to column sums once. Overlapping boxes are then
+        read off prefix sums of those small band arrays.
+        
+        Args:
+            values: Callable returning the per-pixel array for rows [lo, hi)
+            height, width: Box size
+            xs, ys: Sorted unique box x and y starts
+            page_height: Number of rows ``values`` covers
+        
+        Returns:
+            (len(ys), len(xs)) int64 array of box sums
+        """
+        bounds = np.unique(np.concatenate([[0, page_height], ys, ys + height]))
+        bands = np.stack([
+            values(lo, hi).sum(axis=0, dtype=np.uint32)
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ]).astype(np.int64)
+        
+        col_prefix = np.zeros((bands.shape[0], bands.shape[1] + 1), dtype=np.int64)
+        np.cumsum(bands, axis=1, out=col_prefix[:, 1:])
+        band_boxes = col_prefix[:, xs + width] - col_prefix[:, xs]
+        
+        row_prefix = np.zeros((band_boxes.shape[0] + 1, band_boxes.shape[1]), dtype=np.int64)
+        np.cumsum(band_boxes, axis=0, out=row_prefix[1:])
+        return row_prefix[np.searchsorted(bounds, ys + height)] - row_prefix[np.searchsorted(bounds, ys)]
+    
+    @staticmethod
+    def tile_statistics(gray: np.ndarray, offsets: np.ndarray,
+                        tile_size: int = TILE_SIZE) -> Dict[str, np.ndarray]:
+        """
+        Blank and complexity statistics for every tile in one pass over the page
+        
+        Gives the same values as ``is_blank_tile`` and ``calculate_tile_complexity``
+        on each tile, but reads each page pixel once per statistic instead of
+        once per overlapping tile, and never copies a tile.
+        
+        Args:
+            gray: (H, W) uint8 page, at least one tile in each dimension
+            offsets: (N, 2) x/y tile offsets from ``tile_offsets``
+            tile_size: Size of each tile
+        
+        Returns:
+            Dict of (N,) arrays: white_ratio, variance, complexity
+        """
+        xs, x_index = np.unique(offsets[:, 0], return_inverse=True)
+        ys, y_index = np.unique(offsets[:, 1], return_inverse=True)
+        height = gray.shape[0]
+        
+        def tile_sums(values, box_height=tile_size, box_width=tile_size, rows=height):
+            boxes = PDFProcessor._box_sums(values, box_height, box_width, xs, ys, rows)
+            return boxes[y_index, x_index]
+        
+        white = tile_sums(lambda lo, hi: gray[lo:hi] > 240)
+        total = tile_sums(lambda lo, hi: gray[lo:hi])
+        squares = tile_sums(lambda lo, hi: np.square(gray[lo:hi], dtype=np.uint16))  # 255² fits
+        # uint8 differences wrap exactly as they do in calculate_tile_complexity
+        edges = (tile_sums(lambda lo, hi: np.diff(gray[lo:hi + 1], axis=0),
+                           box_height=tile_size - 1, rows=height - 1) +
+                 tile_sums(lambda lo, hi: np.diff(gray[lo:hi], axis=1), box_width=tile_size - 1))
+        
+        pixels = tile_size * tile_size
+        return {
+            'white_ratio': white / pixels,
+            # Exact integer numerator, so this matches np.var on the tile
+            'variance': (squares * pixels - total * total) / (pixels * pixels),
+            'complexity': edges / pixels,
+        }
+    
     def create_tiles(self, image: Image.Image, tile_size: int = TILE_SIZE,
                      overlap: float = OVERLAP_PERCENT,
                      skip_blank: bool = True,
@@ -201,118 +709,61 @@ class PDFProcessor:
         Returns:
             Tuple of (tiles list, statistics dict)
         """
-        tiles = []
         img_width, img_height = image.size
-        stride = int(tile_size * (1 - overlap))
+        
+        # Convert the page once; tile statistics are then read off window sums.
+        gray = self._pad_to_tile(np.asarray(image.convert('L')), tile_size)
+        offsets = self.tile_offsets(img_width, img_height, tile_size, overlap)
         
         stats = {
-            'total_created': 0,
+            'total_created': len(offsets),
             'blank_filtered': 0,
             'edge_filtered': 0,
             'kept': 0
         }
         
-        tile_id = 0
+        keep = np.ones(len(offsets), dtype=bool)
         
-        # Create main grid tiles
-        for y in range(0, img_height - tile_size + 1, stride):
-            for x in range(0, img_width - tile_size + 1, stride):
-                stats['total_created'] += 1
-                
-                # Check if edge tile (skip if enabled)
-                if skip_edges and self.is_edge_tile(x, y, tile_size, img_width, 
-                                                     img_height, edge_margin):
-                    stats['edge_filtered'] += 1
-                    continue
-                
-                # Extract tile
-                tile = image.crop((x, y, x + tile_size, y + tile_size))
-                
-                # Check if blank tile (skip if enabled)
-                if skip_blank and self.is_blank_tile(tile, blank_threshold):
-                    stats['blank_filtered'] += 1
-                    continue
-                
-                # Calculate complexity for prioritization
-                complexity = self.calculate_tile_complexity(tile) if prioritize_complex else 0
-                
-                tiles.append({
-                    'id': tile_id,
-                    'image': tile,
-                    'x': x,
-                    'y': y,
-                    'width': tile_size,
-                    'height': tile_size,
-                    'complexity': complexity
-                })
-                tile_id += 1
-                stats['kept'] += 1
+        # Check edge tiles (skip if enabled)
+        if skip_edges:
+            x, y = offsets[:, 0], offsets[:, 1]
+            edge = ((x < edge_margin) | (y < edge_margin) |
+                    (x + tile_size > img_width - edge_margin) |
+                    (y + tile_size > img_height - edge_margin))
+            stats['edge_filtered'] = int(edge.sum())
+            keep &= ~edge
         
-        # Handle right edge tiles
-        if img_width % stride != 0:
-            x = img_width - tile_size
-            for y in range(0, img_height - tile_size + 1, stride):
-                if skip_edges and self.is_edge_tile(x, y, tile_size, img_width, 
-                                                     img_height, edge_margin):
-                    continue
-                tile = image.crop((x, y, x + tile_size, y + tile_size))
-                if skip_blank and self.is_blank_tile(tile, blank_threshold):
-                    continue
-                complexity = self.calculate_tile_complexity(tile) if prioritize_complex else 0
-                tiles.append({
-                    'id': tile_id,
-                    'image': tile,
-                    'x': x,
-                    'y': y,
-                    'width': tile_size,
-                    'height': tile_size,
-                    'complexity': complexity
-                })
-                tile_id += 1
-                stats['kept'] += 1
+        tile_stats = None
+        if skip_blank or prioritize_complex:
+            tile_stats = self.tile_statistics(gray, offsets, tile_size)
         
-        # Handle bottom edge tiles
-        if img_height % stride != 0:
-            y = img_height - tile_size
-            for x in range(0, img_width - tile_size + 1, stride):
-                if skip_edges and self.is_edge_tile(x, y, tile_size, img_width, 
-                                                     img_height, edge_margin):
-                    continue
-                tile = image.crop((x, y, x + tile_size, y + tile_size))
-                if skip_blank and self.is_blank_tile(tile, blank_threshold):
-                    continue
-                complexity = self.calculate_tile_complexity(tile) if prioritize_complex else 0
+        # Check blank tiles (skip if enabled)
+        if skip_blank:
+            blank = (tile_stats['white_ratio'] > blank_threshold) | (tile_stats['variance'] < 100)
+            stats['blank_filtered'] = int((blank & keep).sum())
+            keep &= ~blank
+        
+        kept_offsets = offsets[keep].tolist()
+        # Complexity for prioritization
+        complexities = tile_stats['complexity'][keep].tolist() if prioritize_complex else [0] * len(kept_offsets)
+        
+        tiles = []
+        if kept_offsets:
+            # Crop only the surviving tiles straight from the rendered page.
+            # Going through a NumPy copy of the page would copy every pixel
+            # twice more (page to array, tile back to PIL) for no benefit.
+            rgb_image = image if image.mode == 'RGB' else image.convert('RGB')
+            for tile_id, ((x, y), complexity) in enumerate(zip(kept_offsets, complexities)):
                 tiles.append({
                     'id': tile_id,
-                    'image': tile,
+                    'image': rgb_image.crop((x, y, x + tile_size, y + tile_size)),
                     'x': x,
                     'y': y,
                     'width': tile_size,
                     'height': tile_size,
                     'complexity': complexity
                 })
-                tile_id += 1
-                stats['kept'] += 1
-        
-        # Bottom-right corner
-        if img_width % stride != 0 and img_height % stride != 0:
-            x = img_width - tile_size
-            y = img_height - tile_size
-            if not (skip_edges and self.is_edge_tile(x, y, tile_size, img_width, 
-                                                     img_height, edge_margin)):
-                tile = image.crop((x, y, x + tile_size, y + tile_size))
-                if not (skip_blank and self.is_blank_tile(tile, blank_threshold)):
-                    complexity = self.calculate_tile_complexity(tile) if prioritize_complex else 0
-                    tiles.append({
-                        'id': tile_id,
-                        'image': tile,
-                        'x': x,
-                        'y': y,
-                        'width': tile_size,
-                        'height': tile_size,
-                        'complexity': complexity
-                    })
-                    stats['kept'] += 1
+        stats['kept'] = len(tiles)
         
         # Sort by complexity if prioritization enabled
         if prioritize_complex and tiles:
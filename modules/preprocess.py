@@ -0,0 +1,56 @@
+"""
+Preprocess Module - Converts tile batches straight into model input layout
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - optional dependency
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+_SCALE = np.float32(1.0 / 255.0)
+
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _to_chw_numba(tiles, out):
+        batch, height, width, channels = tiles.shape
+        scale = np.float32(1.0 / 255.0)
+        # One parallel task per (tile, channel) plane so single-tile batches
+        # still use several cores.
+        for plane in prange(batch * channels):
+            b = plane // channels
+            c = plane % channels
+            for y in range(height):
+                for x in range(width):
+                    out[b, c, y, x] = tiles[b, y, x, c] * scale
+
+
+def tiles_to_chw(tiles: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert RGB uint8 tiles to normalized float32 model input
+
+    Does the HWC->CHW transpose and /255 scaling in one pass, which is all the
+    YOLO letterbox step amounts to for tiles that are already model-sized.
+
+    Args:
+        tiles: (B, H, W, 3) uint8 array of RGB tiles
+        out: Optional preallocated (B, 3, H, W) float32 array to write into
+
+    Returns:
+        (B, 3, H, W) float32 array with values in [0, 1]
+    """
+    batch, height, width, channels = tiles.shape
+    if out is None:
+        out = np.empty((batch, channels, height, width), dtype=np.float32)
+
+    if njit is not None:
+        _to_chw_numba(tiles, out)
+    else:
+        np.multiply(tiles.transpose(0, 3, 1, 2), _SCALE, out=out)
+    return out
@@ -4,9 +4,11 @@ Detection Visualization Module - Draws bounding boxes and performs NMS
 import logging
 from typing import List, Dict, Union
 
+import numpy as np
 from PIL import Image, ImageDraw
 
 from models import FireAlarmDevice
+from .nms import nms
 
 logger = logging.getLogger(__name__)
 
@@ -67,24 +69,15 @@ class DetectionVisualizer:
         if not detections:
             return []
         
-        # Sort by confidence (highest first)
-        detections = sorted(detections, key=lambda x: x['confidence'], reverse=True)
-        
-        kept_detections = []
-        
-        for detection in detections:
-            # Check if this detection overlaps with any kept detection
-            overlap = False
-            for kept in kept_detections:
-                # Only compare same class
-                if detection.get('class') == kept.get('class'):
-                    iou = DetectionVisualizer.calculate_iou(detection, kept)
-                    if iou > iou_threshold:
-                        overlap = True
-                        break
-            
-            if not overlap:
-                kept_detections.append(detection)
+        # Only same-class boxes suppress each other, so classes become codes
+        class_codes = {}
+        classes = [class_codes.setdefault(det.get('class'), len(class_codes)) for det in detections]
+        boxes = np.array([(det['x'], det['y'], det['width'], det['height']) for det in detections],
+                         dtype=np.float64)
+        scores = np.array([det['confidence'] for det in detections], dtype=np.float64)
+        
+        keep = nms(boxes, scores, classes, iou_threshold)
+        kept_detections = [detections[index] for index in keep]
         
         logger.info(f"NMS: Kept {len(kept_detections)} of {len(detections)} detections")
         return kept_detections
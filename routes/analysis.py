@@ -4,25 +4,188 @@ Analysis Routes - PDF analysis and detection endpoints
 import os
 import io
 import uuid
+import hashlib
 import json
+import queue
+import re
+import shutil
 import tempfile
 import threading
+import time
 import logging
 from datetime import datetime
-from collections import Counter
+from pathlib import Path
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
-import fitz
-from flask import request, jsonify, send_file, render_template_string
+from flask import Response, request, jsonify, send_file, render_template_string
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
 
 import config
 from models import FireAlarmDevice, PageAnalysis
+from modules.keywords import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
+_JOB_ID = re.compile(r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
+
+
+class _JobStore:
+    """
+    Finished analysis jobs, shared by every web worker through the cache dir
+
+    Each job is written to ``<job_dir>/<job_id>.json``, so a follow-up
+    request served by a different gunicorn worker still finds it. Recently
+    used jobs are also kept parsed in memory. Jobs expire ``ttl`` seconds
+    after they are stored, and the oldest are dropped early once there are
+    more than ``max_jobs``. A dropped job's temp dir (and the uploaded PDF
+    in it) is deleted. Callers hold ``analysis_lock``.
+    """
+
+    def __init__(self, job_dir, max_jobs, ttl, max_loaded=16):
+        self.job_dir = Path(job_dir)
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.max_loaded = max_loaded
+        self.loaded = OrderedDict()  # job_id -> job, most recently used last
+
+    def __contains__(self, job_id):
+        try:
+            self[job_id]
+        except KeyError:
+            return False
+        return True
+
+    def __getitem__(self, job_id):
+        path = self._path(job_id)
+        try:
+            stored_at = path.stat().st_mtime
+        except OSError:
+            # Never stored, or dropped by another worker
+            self.loaded.pop(job_id, None)
+            raise KeyError(job_id) from None
+
+        if stored_at + self.ttl <= time.time():
+            self._drop(path)
+            raise KeyError(job_id)
+
+        job = self.loaded.get(job_id)
+        if job is not None:
+            self.loaded.move_to_end(job_id)
+            return job
+
+        try:
+            job = json.loads(path.read_bytes())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable analysis job {path}: {e}")
+            raise KeyError(job_id) from None
+        job['page_index'] = _index_pages(job['results'])
+        self._remember(job_id, job)
+        return job
+
+    def __setitem__(self, job_id, job):
+        path = self._path(job_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write via a temp file + rename so other workers never read a partial job
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(_dump_json({key: value for key, value in job.items() if key != 'page_index'}))
+        os.replace(tmp_path, path)
+        self._remember(job_id, job)
+        self._expire()
+
+    def _path(self, job_id):
+        # Job IDs come from URLs, so only plain uuid4 strings map to a file
+        if not _JOB_ID.fullmatch(job_id):
+            return self.job_dir / 'invalid'
+        return self.job_dir / f"{job_id}.json"
+
+    def _remember(self, job_id, job):
+        self.loaded[job_id] = job
+        self.loaded.move_to_end(job_id)
+        while len(self.loaded) > self.max_loaded:
+            self.loaded.popitem(last=False)
+
+    def _expire(self):
+        """Drop expired jobs, then the oldest ones beyond ``max_jobs``"""
+        stored = []
+        for path in self.job_dir.glob('*.json'):
+            try:
+                stored.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        stored.sort()
+
+        expired_before = time.time() - self.ttl
+        excess = len(stored) - self.max_jobs
+        for index, (stored_at, path) in enumerate(stored):
+            if stored_at > expired_before and index >= excess:
+                break
+            self._drop(path)
+
+    def _drop(self, path):
+        job_id = path.stem
+        self.loaded.pop(job_id, None)
+        try:
+            job = json.loads(path.read_bytes())
+            path.unlink()
+        except (OSError, ValueError):
+            # Another worker dropped it first
+            return
+        logger.info(f"Dropping analysis job {job_id}")
+        if job.get('temp_dir'):
+            shutil.rmtree(job['temp_dir'], ignore_errors=True)
+
+
 # Storage for analysis jobs
-analysis_jobs = {}
+analysis_jobs = _JobStore(os.path.join(config.CACHE_DIR, 'jobs'),
+                          config.MAX_ANALYSIS_JOBS, config.ANALYSIS_JOB_TTL)
 analysis_lock = threading.Lock()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Device types that mark a page as mechanical
+MECHANICAL_DEVICE_MATCHER = KeywordMatcher(['mechanical', 'duct', 'damper'])
+
+
+def save_upload(pdf_file, result_cache=None, temp_dir=None):
+    """
+    Stream an uploaded PDF to a temp file in fixed-size chunks
+
+    The SHA-256 is computed on the way through so the result cache never has
+    to read the file back just to hash it. The file is written into
+    ``temp_dir`` when given, otherwise into a new temp dir the caller owns
+    once this returns. If the upload fails part way, a temp dir created
+    here is removed before the error propagates.
+
+    Returns:
+        Tuple of (temp_dir, pdf_path)
+    """
+    owns_temp_dir = temp_dir is None
+    if owns_temp_dir:
+        temp_dir = tempfile.mkdtemp()
+    pdf_path = os.path.join(temp_dir, 'upload.pdf')
+    digest = hashlib.sha256()
+
+    try:
+        with open(pdf_path, 'wb') as f:
+            for chunk in iter(lambda: pdf_file.stream.read(UPLOAD_CHUNK_SIZE), b''):
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        if owns_temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    if result_cache is not None:
+        result_cache.remember_hash(pdf_path, digest.hexdigest())
+
+    return temp_dir, pdf_path
+
 
 def register_analysis_routes(app, analyzer):
     """Register analysis-related routes"""
@@ -72,80 +235,77 @@ def register_analysis_routes(app, analyzer):
         if pdf_file.filename == '':
             return jsonify({'success': False, 'error': 'Empty filename'}), 400
         
-        # Get options from request
-        skip_blank = request.form.get('skip_blank', 'true').lower() == 'true'
-        skip_edges = request.form.get('skip_edges', 'false').lower() == 'true'
-        use_parallel = request.form.get('use_parallel', 'true').lower() == 'true'
-        use_cache = request.form.get('use_cache', 'true').lower() == 'true'
-        confidence = float(request.form.get('confidence', config.DEFAULT_CONFIDENCE))
-        
-        # Handle page selection
-        selected_pages_str = request.form.get('selected_pages')
-        selected_pages = None
-        if selected_pages_str:
-            try:
-                selected_pages = [int(p) for p in selected_pages_str.split(',')]
-                logger.info(f"Will analyze pages: {selected_pages}")
-                if not selected_pages:
-                    return jsonify({'success': False, 'error': 'No valid pages selected'}), 400
-            except ValueError:
-                return jsonify({'success': False, 'error': 'Invalid page numbers'}), 400
+        options, error = _parse_analysis_options()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
         
         # Save uploaded file
         job_id = str(uuid.uuid4())
-        temp_dir = tempfile.mkdtemp()
-        pdf_path = os.path.join(temp_dir, 'upload.pdf')
-        pdf_file.save(pdf_path)
+        temp_dir, pdf_path = save_upload(pdf_file, analyzer.result_cache)
         
         try:
             logger.info(f"Starting analysis job {job_id}")
             
             # Run analysis
-            results = _run_local_detection_analysis(
-                analyzer,
-                pdf_path,
-                skip_blank,
-                skip_edges,
-                use_parallel,
-                use_cache,
-                confidence,
-                selected_pages
-            )
-            
-            if selected_pages:
-                results['selected_pages'] = selected_pages
-            
-            # Store results
-            with analysis_lock:
-                analysis_jobs[job_id] = {
-                    'results': results,
-                    'pdf_path': pdf_path,
-                    'temp_dir': temp_dir,
-                    'timestamp': datetime.now().isoformat()
-                }
-            
-            logger.info(f"Analysis job {job_id} completed")
-            
-            response_data = {
-                'success': True,
-                'job_id': job_id,
-                'total_devices': sum(len(page.get('devices', [])) for page in results.get('page_analyses', [])),
-                'pages_with_devices': sum(1 for page in results.get('page_analyses', []) if page.get('devices')),
-                'total_pages': len(results.get('page_analyses', [])),
-                'page_analyses': results.get('page_analyses', [])
-            }
-            
+            results = _run_local_detection_analysis(analyzer, pdf_path, **options)
+            response_data = _store_analysis_job(job_id, results, pdf_path, temp_dir,
+                                                options['selected_pages'])
             return jsonify(response_data)
             
         except Exception as e:
             logger.error(f"Error in analysis: {str(e)}", exc_info=True)
             # Cleanup on error
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+            shutil.rmtree(temp_dir, ignore_errors=True)
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    @app.route("/api/analyze_stream", methods=["POST"])
+    def analyze_pdf_stream():
+        """
+        Analyze uploaded PDF with local detection, streaming NDJSON
+
+        Emits one {"type": "page", ...} line as each page finishes, then a
+        final {"type": "done", ...} line with the same summary /api/analyze
+        returns, so clients can render early pages before the last one is done.
+        """
+        if 'pdf' not in request.files:
+            return jsonify({'success': False, 'error': 'No PDF file provided'}), 400
+        
+        pdf_file = request.files['pdf']
+        if pdf_file.filename == '':
+            return jsonify({'success': False, 'error': 'Empty filename'}), 400
+        
+        options, error = _parse_analysis_options()
+        if error:
+            return jsonify({'success': False, 'error': error}), 400
+        
+        job_id = str(uuid.uuid4())
+        temp_dir, pdf_path = save_upload(pdf_file, analyzer.result_cache)
+        events = queue.Queue()
+        
+        def run_analysis():
+            try:
+                logger.info(f"Starting streamed analysis job {job_id}")
+                results = _run_local_detection_analysis(analyzer, pdf_path, on_page=events.put, **options)
+                done = _store_analysis_job(job_id, results, pdf_path, temp_dir,
+                                           options['selected_pages'])
+            except Exception as e:
+                logger.error(f"Error in analysis: {str(e)}", exc_info=True)
+                shutil.rmtree(temp_dir, ignore_errors=True)
+                done = {'success': False, 'error': str(e)}
+            events.put(_StreamDone(done))
+        
+        threading.Thread(target=run_analysis, name=f'analysis-{job_id[:8]}', daemon=True).start()
+        
+        def generate():
+            while True:
+                event = events.get()
+                if isinstance(event, _StreamDone):
+                    yield app.json.dumps({'type': 'done', **event.payload}) + "\n"
+                    return
+                yield app.json.dumps({'type': 'page', 'job_id': job_id, 'page': event}) + "\n"
+        
+        return Response(generate(), mimetype='application/x-ndjson')
+    
     @app.route("/api/analyze_gemini", methods=["POST"])
     def analyze_gemini():
         """Analyze PDF using Gemini AI"""
@@ -161,9 +321,7 @@ def register_analysis_routes(app, analyzer):
         
         # Save uploaded file
         job_id = str(uuid.uuid4())
-        temp_dir = tempfile.mkdtemp()
-        pdf_path = os.path.join(temp_dir, 'upload.pdf')
-        pdf_file.save(pdf_path)
+        temp_dir, pdf_path = save_upload(pdf_file, analyzer.result_cache)
         
         try:
             logger.info(f"Starting Gemini analysis job {job_id}")
@@ -178,6 +336,7 @@ def register_analysis_routes(app, analyzer):
             with analysis_lock:
                 analysis_jobs[job_id] = {
                     'results': results,
+                    'page_index': _index_pages(results),
                     'pdf_path': pdf_path,
                     'temp_dir': temp_dir,
                     'timestamp': datetime.now().isoformat(),
@@ -191,62 +350,70 @@ def register_analysis_routes(app, analyzer):
             
         except Exception as e:
             logger.error(f"Error in Gemini analysis: {str(e)}", exc_info=True)
-            if os.path.exists(pdf_path):
-                os.remove(pdf_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+            shutil.rmtree(temp_dir, ignore_errors=True)
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    @lru_cache(maxsize=config.VISUALIZATION_CACHE_SIZE)
+    def build_visualization(job_id, page_num):
+        """
+        Render one page of a job with its stored detections drawn on, as JPEG bytes
+
+        The devices come from the job's own analysis, already in pixels at
+        the processor DPI, so nothing is re-detected. Gemini jobs have no
+        device boxes, so their pages are run through the local detector.
+        Users flip back and forth between pages, so results are kept per
+        (job, page). Returns None if the PDF has no such page; raises
+        _JobNotFound if the job has expired.
+        """
+        with analysis_lock:
+            try:
+                job = analysis_jobs[job_id]
+            except KeyError:
+                raise _JobNotFound(job_id) from None
+        page_analysis = job['page_index'].get(page_num)
+        
+        # Convert PDF page to image
+        # Pass page_num as a single-item list
+        images = analyzer.pdf_processor.pdf_to_images(job['pdf_path'], selected_pages=[page_num])
+        if not images:
+            return None
+        
+        image = images[0] # We only requested one image
+        
+        if job.get('analysis_type') == 'gemini':
+            if analyzer.local_detector:
+                detections = _detect_on_page(analyzer, page_num, image, True, False, True, True,
+                                             config.DEFAULT_CONFIDENCE)
+                if detections:
+                    filtered_detections = analyzer.visualizer.remove_overlapping_detections(detections)
+                    image = analyzer.visualizer.draw_detections(image, filtered_detections)
+        # Pages that were not analyzed are shown without boxes
+        elif page_analysis and page_analysis['devices']:
+            image = analyzer.visualizer.draw_detections(image, page_analysis['devices'])
+        
+        # Convert to bytes
+        img_io = io.BytesIO()
+        image.save(img_io, 'JPEG', quality=95)
+        return img_io.getvalue()
+    
     @app.route("/api/visualize/<job_id>/<int:page_num>", methods=["GET"])
     def visualize_page(job_id, page_num):
         """Get visualized page with detections"""
+        # Checked on every request: a render cached before the job expired
+        # must not outlive it
         with analysis_lock:
             if job_id not in analysis_jobs:
                 return jsonify({'success': False, 'error': 'Job not found'}), 404
-            job = analysis_jobs[job_id]
         
         try:
-            # Convert PDF page to image
-            # Pass page_num as a single-item list
-            images = analyzer.pdf_processor.pdf_to_images(job['pdf_path'], selected_pages=[page_num])
-            if not images:
+            jpeg_bytes = build_visualization(job_id, page_num)
+            if jpeg_bytes is None:
                 return jsonify({'success': False, 'error': 'Invalid page number'}), 404
             
-            image = images[0] # We only requested one image
-            
-            # Create and process tiles
-            tiles, _ = analyzer.pdf_processor.create_tiles(
-                image,
-                skip_blank=True,
-                skip_edges=False,
-                prioritize_complex=True
-            )
-            
-            if not tiles:
-                # Return original image if no tiles
-                img_io = io.BytesIO()
-                image.save(img_io, 'JPEG', quality=95)
-                img_io.seek(0)
-                return send_file(img_io, mimetype='image/jpeg')
-            
-            # Run detection
-            detections, _ = analyzer.local_detector.process_all_tiles_parallel(
-                tiles, config.DEFAULT_CONFIDENCE, config.MAX_WORKERS, use_cache=True
-            )
-            
-            # Remove overlaps
-            filtered_detections = analyzer.visualizer.remove_overlapping_detections(detections)
-            
-            # Draw detections
-            annotated_image = analyzer.visualizer.draw_detections(image, filtered_detections)
-            
-            # Convert to bytes
-            img_io = io.BytesIO()
-            annotated_image.save(img_io, 'JPEG', quality=95)
-            img_io.seek(0)
-            
-            return send_file(img_io, mimetype='image/jpeg')
+            return send_file(io.BytesIO(jpeg_bytes), mimetype='image/jpeg')
             
+        except _JobNotFound:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
         except Exception as e:
             logger.error(f"Error visualizing page: {str(e)}", exc_info=True)
             return jsonify({'success': False, 'error': str(e)}), 500
@@ -259,116 +426,174 @@ def register_analysis_routes(app, analyzer):
                 return jsonify({'success': False, 'error': 'Job not found'}), 404
             job = analysis_jobs[job_id]
         
-        # Create JSON file
-        json_str = json.dumps(job['results'], indent=2)
-        json_io = io.BytesIO(json_str.encode())
-        
-        return send_file(
-            json_io,
+        return Response(
+            _export_chunks(job['results']),
             mimetype='application/json',
-            as_attachment=True,
-            download_name=f'fire_alarm_analysis_{job_id}.json'
+            headers={'Content-Disposition': f'attachment; filename=fire_alarm_analysis_{job_id}.json'}
         )
 
 
+def _dump_json(obj):
+    """Serialize to compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj).encode()
+
+
+def _export_chunks(results):
+    """
+    Yield a results dict as JSON, one page analysis at a time
+
+    Only one page's bytes exist at once rather than the whole document.
+    Results without page analyses (Gemini or failed jobs) are written as is.
+    """
+    summary = _dump_json({key: value for key, value in results.items() if key != 'page_analyses'})
+    if 'page_analyses' not in results:
+        yield summary
+        return
+    
+    yield summary[:-1] + (b',' if len(summary) > 2 else b'') + b'"page_analyses":['
+    for index, page_analysis in enumerate(results.get('page_analyses', [])):
+        yield (b',' if index else b'') + _dump_json(page_analysis)
+    yield b']}'
+
+
+class _JobNotFound(Exception):
+    """Raised when a job is missing or expired by the time it is read"""
+
+
+class _StreamDone:
+    """End-of-stream marker carrying the final summary"""
+
+    def __init__(self, payload):
+        self.payload = payload
+
+
+def _parse_analysis_options():
+    """
+    Read local-analysis options from the request form
+
+    Returns:
+        Tuple of (options dict, error message or None)
+    """
+    options = {
+        'skip_blank': request.form.get('skip_blank', 'true').lower() == 'true',
+        'skip_edges': request.form.get('skip_edges', 'false').lower() == 'true',
+        'use_parallel': request.form.get('use_parallel', 'true').lower() == 'true',
+        'use_cache': request.form.get('use_cache', 'true').lower() == 'true',
+        'confidence': config.DEFAULT_CONFIDENCE,
+        'selected_pages': None,
+    }
+    
+    try:
+        options['confidence'] = float(request.form.get('confidence', config.DEFAULT_CONFIDENCE))
+    except ValueError:
+        return options, 'Invalid confidence value'
+    
+    # Handle page selection
+    selected_pages_str = request.form.get('selected_pages')
+    if selected_pages_str:
+        try:
+            selected_pages = [int(p) for p in selected_pages_str.split(',')]
+            logger.info(f"Will analyze pages: {selected_pages}")
+            if not selected_pages:
+                return options, 'No valid pages selected'
+        except ValueError:
+            return options, 'Invalid page numbers'
+        options['selected_pages'] = selected_pages
+    
+    return options, None
+
+
+def _index_pages(results):
+    """Map page number to page analysis so a page's results can be looked up directly"""
+    return {int(page['page_number']): page for page in results.get('page_analyses', [])}
+
+
+def _store_analysis_job(job_id, results, pdf_path, temp_dir, selected_pages):
+    """Store a finished local analysis and build its response summary"""
+    if selected_pages:
+        results['selected_pages'] = selected_pages
+    
+    # Store results
+    with analysis_lock:
+        analysis_jobs[job_id] = {
+            'results': results,
+            'page_index': _index_pages(results),
+            'pdf_path': pdf_path,
+            'temp_dir': temp_dir,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    logger.info(f"Analysis job {job_id} completed")
+    
+    page_analyses = results.get('page_analyses', [])
+    return {
+        'success': True,
+        'job_id': job_id,
+        'total_devices': sum(len(page.get('devices', [])) for page in page_analyses),
+        'pages_with_devices': sum(1 for page in page_analyses if page.get('devices')),
+        'total_pages': len(page_analyses),
+        'page_analyses': page_analyses
+    }
+
+
 def _run_local_detection_analysis(analyzer, pdf_path, skip_blank, skip_edges,
-                                  use_parallel, use_cache, confidence, selected_pages=None):
-    """Run local model analysis on PDF"""
+                                  use_parallel, use_cache, confidence, selected_pages=None,
+                                  on_page=None):
+    """
+    Run local model analysis on PDF
+
+    ``on_page`` is called with each page analysis dict as soon as it is ready.
+    """
     if not analyzer.local_detector:
         return {'success': False, 'error': 'Local detector not initialized'}
     
     try:
-        # Convert PDF to images
-        images = analyzer.pdf_processor.pdf_to_images(pdf_path, selected_pages)
-        if not images:
-            return {'success': False, 'error': 'Failed to convert PDF'}
-        
-        logger.info(f"Converted {len(images)} pages")
-        
+        # Reuse results from an earlier run on the same file with the same options
+        if use_cache:
+            file_hash = analyzer.result_cache.hash_file(pdf_path)
+            cache_options = _detection_cache_options(skip_blank, skip_edges, use_parallel, confidence,
+                                                     selected_pages)
+            cached_results = analyzer.result_cache.get_detections(file_hash, cache_options)
+            if cached_results is not None:
+                logger.info(f"Using cached detection results for {file_hash[:12]}")
+                cached_results['pdf_path'] = pdf_path
+                cached_results['processing_stats']['result_cache_hit'] = True
+                if on_page:
+                    for page_analysis in cached_results['page_analyses']:
+                        on_page(page_analysis)
+                return cached_results
+
         # Analyze each page
         page_analyses = []
         total_devices = []
-        
-        # Use the correct page numbers if a selection was made
-        page_numbers_to_process = selected_pages if selected_pages else range(1, len(images) + 1)
+        pages_scanned = 0
 
-        for i, image in enumerate(images):
-            page_num = page_numbers_to_process[i] # Get the original page number
-            logger.info(f"Processing page {page_num} ({i+1}/{len(images)} selected)")
-            
-            # Create tiles
-            tiles, tile_stats = analyzer.pdf_processor.create_tiles(
-                image,
-                tile_size=config.TILE_SIZE,
-                overlap=config.OVERLAP_PERCENT,
-                skip_blank=skip_blank,
-                skip_edges=skip_edges,
-                prioritize_complex=True
-            )
-            
-            logger.info(f"Page {page_num} - Created {tile_stats['kept']} tiles")
-            
-            if not tiles:
-                page_analyses.append(PageAnalysis(
-                    page_number=page_num,
-                    is_fire_alarm_page=False,
-                    page_type='other',
-                    devices=[],
-                    keyed_notes=[],
-                    specifications=[]
-                ).to_dict())
-                continue
-            
-            # Run detection
-            if use_parallel:
-                detections, proc_stats = analyzer.local_detector.process_all_tiles_parallel(
-                    tiles, confidence, config.MAX_WORKERS, use_cache
-                )
-            else:
-                detections, proc_stats = analyzer.local_detector.process_all_tiles_sequential(
-                    tiles, confidence, use_cache
-                )
-            
-            logger.info(f"Page {page_num} - Found {len(detections)} raw detections")
-            
-            # Remove overlaps
-            filtered_detections = analyzer.visualizer.remove_overlapping_detections(detections)
-            
-            logger.info(f"Page {page_num} - {len(filtered_detections)} unique detections after NMS")
-            
-            # Convert to FireAlarmDevice objects
-            devices = []
-            for det in filtered_detections:
-                device = FireAlarmDevice(
-                    device_type=det['class'],
-                    location=f"Page {page_num}",
-                    page_number=page_num,
-                    confidence=det['confidence'],
-                    x=int(det['x']),
-                    y=int(det['y']),
-                    width=int(det['width']),
-                    height=int(det['height'])
-                )
-                devices.append(device)
-                total_devices.append(device)
-            
-            # Create page analysis
-            page_analysis = PageAnalysis(
-                page_number=page_num,
-                is_fire_alarm_page=len(devices) > 0,
-                page_type=_classify_page_type(page_num, devices),
-                devices=devices,
-                keyed_notes=[],
-                specifications=[]
-            )
-            
-            page_analyses.append(page_analysis.to_dict())
+        full_dpi = analyzer.pdf_processor.dpi
+        render_dpi = config.DRAFT_DPI if config.ADAPTIVE_DPI else full_dpi
+
+        # Pages are rendered as they are consumed, so only the pages being
+        # analyzed (plus any rendering ahead in the pool) are held in memory.
+        page_workers = config.PAGE_WORKERS if use_parallel else 1
+        pages = analyzer.pdf_processor.iter_pages(pdf_path, selected_pages, render_dpi)
+        analyze_page = partial(_analyze_page, analyzer, pdf_path, render_dpi, skip_blank,
+                               skip_edges, use_parallel, use_cache, confidence)
+        for page_analysis, devices in _map_pages(analyze_page, pages, page_workers):
+            pages_scanned += 1
+            total_devices.extend(devices)
+            page_analyses.append(page_analysis)
+            if on_page:
+                on_page(page_analysis)
+        
+        if not pages_scanned:
+            return {'success': False, 'error': 'Failed to convert PDF'}
         
         # Compile results
         results = {
             'success': True,
             'pdf_path': pdf_path,
-            'total_pages_scanned': len(images),
+            'total_pages_scanned': pages_scanned,
             'pages_with_devices': sum(1 for p in page_analyses if p['devices']),
             'total_devices': len(total_devices),
             'device_summary': _summarize_devices(total_devices),
@@ -383,7 +608,11 @@ def _run_local_detection_analysis(analyzer, pdf_path, skip_blank, skip_edges,
                 }
             }
         }
-        
+
+        if use_cache:
+            analyzer.result_cache.set_detections(file_hash, cache_options, results)
+        results['processing_stats']['result_cache_hit'] = False
+
         return results
         
     except Exception as e:
@@ -391,14 +620,190 @@ def _run_local_detection_analysis(analyzer, pdf_path, skip_blank, skip_edges,
         return {'success': False, 'error': str(e)}
 
 
+def _analyze_page(analyzer, pdf_path, render_dpi, skip_blank, skip_edges,
+                  use_parallel, use_cache, confidence, page_num, image):
+    """
+    Detect devices on one rendered page
+
+    Returns:
+        Tuple of (page analysis dict, list of FireAlarmDevice)
+    """
+    logger.info(f"Processing page {page_num}")
+    full_dpi = analyzer.pdf_processor.dpi
+    
+    detections = _detect_on_page(analyzer, page_num, image, skip_blank, skip_edges,
+                                 use_parallel, use_cache, confidence)
+    
+    # A draft-resolution page is redone at full DPI unless the draft
+    # pass found confident detections. A draft where every tile was
+    # skipped (None) counts as finding nothing.
+    if render_dpi != full_dpi:
+        full_images = []
+        if detections is None or _needs_full_resolution(detections):
+            logger.info(f"Page {page_num} - Draft pass inconclusive, re-rendering at {full_dpi} DPI")
+            full_images = analyzer.pdf_processor.pdf_to_images(pdf_path, [page_num])
+        if full_images:
+            detections = _detect_on_page(analyzer, page_num, full_images[0], skip_blank, skip_edges,
+                                         use_parallel, use_cache, confidence)
+        elif detections is not None:
+            _scale_detections(detections, full_dpi / render_dpi)
+    
+    if detections is None:
+        return PageAnalysis(
+            page_number=page_num,
+            is_fire_alarm_page=False,
+            page_type='other',
+            devices=[],
+            keyed_notes=[],
+            specifications=[]
+        ).to_dict(), []
+    
+    # Remove overlaps
+    filtered_detections = analyzer.visualizer.remove_overlapping_detections(detections)
+    
+    logger.info(f"Page {page_num} - {len(filtered_detections)} unique detections after NMS")
+    
+    # Convert to FireAlarmDevice objects, all sharing one location string
+    location = f"Page {page_num}"
+    devices = []
+    for det in filtered_detections:
+        device = FireAlarmDevice(
+            device_type=det['class'],
+            location=location,
+            page_number=page_num,
+            confidence=det['confidence'],
+            x=int(det['x']),
+            y=int(det['y']),
+            width=int(det['width']),
+            height=int(det['height'])
+        )
+        devices.append(device)
+    
+    # Create page analysis
+    page_analysis = PageAnalysis(
+        page_number=page_num,
+        is_fire_alarm_page=len(devices) > 0,
+        page_type=_classify_page_type(page_num, devices),
+        devices=devices,
+        keyed_notes=[],
+        specifications=[]
+    )
+    
+    return page_analysis.to_dict(), devices
+
+
+def _map_pages(analyze_page, pages, workers):
+    """
+    Run ``analyze_page`` over ``(page_num, image)`` pairs, yielding in page order
+
+    With more than one worker, up to ``workers`` pages are analyzed at once on
+    threads. They share the detector (and its batcher), so tiles from
+    neighbouring pages fill the same inference batches and one page's tiling
+    and NMS overlap another's inference.
+    """
+    if workers <= 1:
+        for page_num, image in pages:
+            yield analyze_page(page_num, image)
+        return
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='page') as executor:
+        pending = deque()
+        try:
+            for page_num, image in pages:
+                pending.append(executor.submit(analyze_page, page_num, image))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _detect_on_page(analyzer, page_num, image, skip_blank, skip_edges,
+                    use_parallel, use_cache, confidence):
+    """
+    Tile a page image and run the local detector over it
+
+    Returns raw detections in the image's pixel space, or None when every
+    tile was skipped.
+    """
+    tiles, tile_stats = analyzer.pdf_processor.create_tiles(
+        image,
+        tile_size=config.TILE_SIZE,
+        overlap=config.OVERLAP_PERCENT,
+        skip_blank=skip_blank,
+        skip_edges=skip_edges,
+        prioritize_complex=True
+    )
+    
+    logger.info(f"Page {page_num} - Created {tile_stats['kept']} tiles")
+    
+    if not tiles:
+        return None
+    
+    if use_parallel:
+        detections, _ = analyzer.local_detector.process_all_tiles_parallel(
+            tiles, confidence, config.MAX_WORKERS, use_cache
+        )
+    else:
+        detections, _ = analyzer.local_detector.process_all_tiles_sequential(
+            tiles, confidence, use_cache
+        )
+    
+    logger.info(f"Page {page_num} - Found {len(detections)} raw detections")
+    return detections
+
+
+def _needs_full_resolution(detections):
+    """Whether a draft-resolution pass was too weak to trust"""
+    if not detections:
+        return True
+    mean_confidence = sum(det['confidence'] for det in detections) / len(detections)
+    return mean_confidence < config.ADAPTIVE_MIN_CONFIDENCE
+
+
+def _scale_detections(detections, factor):
+    """Map draft-resolution detections onto full-resolution page coordinates"""
+    for det in detections:
+        for key in ('x', 'y', 'width', 'height'):
+            det[key] *= factor
+
+
+def _detection_cache_options(skip_blank, skip_edges, use_parallel, confidence, selected_pages):
+    """
+    Options that change detection output, used to key the result cache
+
+    ``use_parallel`` is part of the key because the sequential path keeps the
+    model's box sizes while the parallel path clamps them.
+    """
+    model_path = getattr(config, 'LOCAL_MODEL_PATH', '') or ''
+    model_hash = config.model_sha256(model_path) if os.path.isfile(model_path) else None
+    return {
+        'model_path': model_path,
+        'model_sha256': model_hash,
+        'dpi': config.DPI,
+        'draft_dpi': config.DRAFT_DPI if config.ADAPTIVE_DPI else None,
+        'adaptive_min_confidence': config.ADAPTIVE_MIN_CONFIDENCE if config.ADAPTIVE_DPI else None,
+        'tile_size': config.TILE_SIZE,
+        'overlap': config.OVERLAP_PERCENT,
+        'skip_blank': skip_blank,
+        'skip_edges': skip_edges,
+        'use_parallel': use_parallel,
+        'confidence': confidence,
+        'selected_pages': selected_pages,
+    }
+
+
 def _classify_page_type(page_num, devices):
     """Classify page type based on devices"""
     if not devices:
         return "other"
     
-    device_types = [d.device_type.lower() for d in devices]
+    # A page has many devices but only a handful of distinct types
+    device_types = {d.device_type for d in devices}
     
-    if any('mechanical' in dt or 'duct' in dt or 'damper' in dt for dt in device_types):
+    if any(MECHANICAL_DEVICE_MATCHER.search(dt) for dt in device_types):
         return "mechanical"
     elif len(devices) > 5:
         return "special_systems"
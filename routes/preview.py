@@ -1,18 +1,62 @@
 """
 Preview Routes - PDF page preview and download endpoints
 """
-import os
 import io
-import base64
-import tempfile
+import re
 import logging
+import tempfile
 
 import fitz
-from PIL import Image
+import numpy as np
 from flask import request, jsonify, send_file
 
+from routes.analysis import save_upload
+
 logger = logging.getLogger(__name__)
 
+_FILE_HASH = re.compile(r'[0-9a-f]{64}')
+THUMBNAIL_SIZE = 300  # Longest thumbnail side in pixels
+MIN_BOX_POINTS = 2  # Annotated-download boxes smaller than this are not drawn
+
+
+def _annotate_page(page, devices, detection_dpi):
+    """
+    Draw device boxes and labels onto a PDF page as vector graphics
+
+    Device coordinates are center-format pixels at ``detection_dpi`` on the
+    page as displayed, so they are scaled to points and mapped back through
+    the page's rotation.
+    """
+    boxes = np.array([(device.get('x', 0), device.get('y', 0), device.get('width', 0), device.get('height', 0))
+                      for device in devices], dtype=np.float64).reshape(-1, 4) * (72.0 / detection_dpi)
+
+    # Skip tiny boxes
+    kept = np.flatnonzero((boxes[:, 2] >= MIN_BOX_POINTS) & (boxes[:, 3] >= MIN_BOX_POINTS))
+    if not kept.size:
+        return
+
+    corners = np.hstack((boxes[:, :2] - boxes[:, 2:] / 2, boxes[:, :2] + boxes[:, 2:] / 2))
+
+    if not page.is_wrapped:
+        page.wrap_contents()
+
+    # One shape for every box, so the page contents are rewritten once
+    derotate = page.derotation_matrix
+    shape = page.new_shape()
+    for index in kept.tolist():
+        device = devices[index]
+        # Class/type and confidence
+        d_type = device.get('device_type') or device.get('class', 'unknown')
+        conf = float(device.get('confidence', 0))
+
+        x1, y1, x2, y2 = corners[index].tolist()
+        shape.draw_rect(fitz.Rect(x1, y1, x2, y2) * derotate)
+        label = f"{d_type} ({conf*100:.1f}%)"
+        shape.insert_text(fitz.Point(x1, y1 - 3) * derotate, label, fontsize=6,
+                          color=(1, 0, 0), rotate=page.rotation)
+    shape.finish(color=(1, 0, 0), width=1)
+    shape.commit()
+
 
 def register_preview_routes(app, analyzer):
     """Register preview-related routes"""
@@ -33,32 +77,26 @@ def register_preview_routes(app, analyzer):
         try:
             logger.info(f"Processing PDF preview request for: {pdf_file.filename}")
 
-            temp_dir = tempfile.mkdtemp()
-            pdf_path = os.path.join(temp_dir, 'upload.pdf')
-            pdf_file.save(pdf_path)
+            # The upload is only needed while thumbnails are rendered
+            with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+                _, pdf_path = save_upload(pdf_file, analyzer.result_cache, temp_dir)
+                file_hash = analyzer.result_cache.hash_file(pdf_path)
 
-            doc = fitz.open(pdf_path)
-            pages = []
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                mat = fitz.Matrix(150 / 72, 150 / 72)
-                pix = page.get_pixmap(matrix=mat)
+                with fitz.open(pdf_path) as doc:
+                    page_count = len(doc)
 
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                img.thumbnail((300, 300))
+                # Thumbnails are stored by file hash and fetched by the browser
+                # through /api/thumb, so a re-upload of the same PDF renders nothing
+                missing = [page_number for page_number in range(1, page_count + 1)
+                           if not analyzer.result_cache.thumbnail_path(file_hash, page_number).is_file()]
+                for page_number, data in analyzer.pdf_processor.iter_thumbnails(pdf_path, missing, THUMBNAIL_SIZE):
+                    if data is not None:
+                        analyzer.result_cache.set_thumbnail(file_hash, page_number, data)
 
-                buffered = io.BytesIO()
-                img.save(buffered, format="JPEG", quality=85)
-                img_str = base64.b64encode(buffered.getvalue()).decode()
-
-                pages.append({
-                    'thumbnail': f'data:image/jpeg;base64,{img_str}',
-                    'page_number': page_num + 1
-                })
-
-            doc.close()
-            os.remove(pdf_path)
-            os.rmdir(temp_dir)
+                pages = [{
+                    'url': f'/api/thumb/{file_hash}/{page_number}',
+                    'page_number': page_number
+                } for page_number in range(1, page_count + 1)]
 
             return jsonify({'success': True, 'pages': pages, 'total_pages': len(pages)})
 
@@ -66,6 +104,18 @@ def register_preview_routes(app, analyzer):
             logger.error(f"Error generating previews: {str(e)}", exc_info=True)
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route("/api/thumb/<file_hash>/<int:page_num>", methods=["GET"])
+    def page_thumbnail(file_hash, page_num):
+        """Serve a thumbnail written by preview_pages"""
+        if not _FILE_HASH.fullmatch(file_hash):
+            return jsonify({'success': False, 'error': 'Thumbnail not found'}), 404
+
+        path = analyzer.result_cache.thumbnail_path(file_hash, page_num)
+        if not path.is_file():
+            return jsonify({'success': False, 'error': 'Thumbnail not found'}), 404
+
+        return send_file(path, mimetype='image/jpeg', max_age=3600)
+
     # ---------------------------------------------------------------------
     # DOWNLOAD ANNOTATED PAGE AS PDF
     # ---------------------------------------------------------------------
@@ -86,117 +136,32 @@ def register_preview_routes(app, analyzer):
         try:
             logger.info(f"Requested annotated download for job {job_id}, page {page_num}")
 
-            # Open source PDF
-            doc = fitz.open(job['pdf_path'])
-            if page_num > len(doc):
-                doc.close()
-                return jsonify({'success': False, 'error': 'Invalid page number'}), 404
-
-            # Locate analysis for this page
-            page_analysis = next(
-                (p for p in results['page_analyses'] if int(p['page_number']) == int(page_num)),
-                None
-            )
-            if not page_analysis:
-                doc.close()
-                return jsonify({'success': False, 'error': f'No analysis for page {page_num}'}), 404
-
-            devices = page_analysis.get('devices', [])
-            logger.info(f"Found analysis with {len(devices)} devices")
-
-            # -----------------------------------------------------------------
-            # Render PDF page and compute proper DPI scaling
-            # -----------------------------------------------------------------
-            render_dpi = 180
-            training_dpi = 350
+            # Open source PDF; both documents are closed even if drawing fails
+            with fitz.open(job['pdf_path']) as doc, fitz.open() as pdf_output:
+                if page_num > len(doc):
+                    return jsonify({'success': False, 'error': 'Invalid page number'}), 404
 
-            page = doc[page_num - 1]
-            mat = fitz.Matrix(render_dpi / 72, render_dpi / 72)
-            pix = page.get_pixmap(matrix=mat)
-            image = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                # Locate analysis for this page
+                page_analysis = job['page_index'].get(page_num)
+                if not page_analysis:
+                    return jsonify({'success': False, 'error': f'No analysis for page {page_num}'}), 404
 
-            # Compute page size in inches (PDF units are 1/72 inch)
-            page_rect = page.rect
-            pdf_width_inch = page_rect.width / 72.0
-            pdf_height_inch = page_rect.height / 72.0
-
-            # Determine scale factors between training and render DPI
-            training_width_px = pdf_width_inch * training_dpi
-            training_height_px = pdf_height_inch * training_dpi
-            scale_x = (pdf_width_inch * render_dpi) / training_width_px
-            scale_y = (pdf_height_inch * render_dpi) / training_height_px
-
-            # -----------------------------------------------------------------
-            # Draw annotations (YOLO/Roboflow center-based boxes)
-            # -----------------------------------------------------------------
-            from PIL import ImageDraw, ImageFont
-            annotated_image = image.copy()
-            draw = ImageDraw.Draw(annotated_image)
-            try:
-                # Try to load a slightly larger font if possible
-                font = ImageFont.truetype("arial.ttf", 12)
-            except IOError:
-                font = ImageFont.load_default()
-
-            render_dpi = 180
-            training_dpi = 350
-            
-            # This is the scale factor for render DPI vs training DPI
-            # Calculate a single scaling factor between the model’s DPI (350) and the
-            # rendered preview DPI (180).  See conversion notes here:contentReference[oaicite:0]{index=0}.
-            render_scale = render_dpi / training_dpi  # e.g. 180 / 350
-
-            for device in devices:
-                # Class/type and confidence
-                d_type = device.get('device_type') or device.get('class', 'unknown')
-                conf = float(device.get('confidence', 0))
-
-                # Detector outputs are in pixels at training DPI (350)
-                x_center_350 = float(device.get('x', 0))
-                y_center_350 = float(device.get('y', 0))
-                w_350 = float(device.get('width', 0))
-                h_350 = float(device.get('height', 0))
-
-                # Scale everything to 180 DPI
-                x_center_180 = x_center_350 * render_scale
-                y_center_180 = y_center_350 * render_scale
-                w_180 = w_350 * render_scale
-                h_180 = h_350 * render_scale
-
-                # Skip tiny boxes
-                if w_180 < 5 or h_180 < 5:
-                    continue
-
-                # Convert centre to corner coordinates
-                x1 = x_center_180 - (w_180 / 2)
-                y1 = y_center_180 - (h_180 / 2)
-                x2 = x_center_180 + (w_180 / 2)
-                y2 = y_center_180 + (h_180 / 2)
-
-                draw.rectangle([x1, y1, x2, y2], outline="red", width=2)
-                label = f"{d_type} ({conf*100:.1f}%)"
-                draw.text((x1, y1 - 10), label, fill="red", font=font)
-
-            # -----------------------------------------------------------------
-            # Convert annotated image → single-page PDF
-            # -----------------------------------------------------------------
-            img_buffer = io.BytesIO()
-            annotated_image.save(img_buffer, format="PNG")
-            img_buffer.seek(0)
+                devices = page_analysis.get('devices', [])
+                logger.info(f"Found analysis with {len(devices)} devices")
 
-            pdf_output = fitz.open()
-            rect = fitz.Rect(0, 0, annotated_image.width, annotated_image.height)
-            pdf_page = pdf_output.new_page(width=rect.width, height=rect.height)
-            pdf_page.insert_image(rect, stream=img_buffer.getvalue())
+                # Copy the original page so its drawing stays vector, then
+                # draw the detections onto it as PDF rectangles and text
+                pdf_output.insert_pdf(doc, from_page=page_num - 1, to_page=page_num - 1)
+                _annotate_page(pdf_output[0], devices, analyzer.pdf_processor.dpi)
 
-            pdf_bytes = pdf_output.tobytes()
-            pdf_output.close()
-            doc.close()
+                # Save straight into the response buffer, dropping unused objects
+                # and compressing streams on the way
+                pdf_io = io.BytesIO()
+                pdf_output.save(pdf_io, garbage=4, deflate=True)
 
             # -----------------------------------------------------------------
             # Send file to client
             # -----------------------------------------------------------------
-            pdf_io = io.BytesIO(pdf_bytes)
             pdf_io.seek(0)
             return send_file(
                 pdf_io,
@@ -204,11 +169,6 @@ def register_preview_routes(app, analyzer):
                 as_attachment=True,
                 download_name=f'annotated_page_{page_num}.pdf'
             )
-            if devices:
-                sample = devices[0]
-                logger.debug(f"Sample device: {sample}")
-            else:
-                logger.debug("No devices detected on this page")
 
         except Exception as e:
             logger.error(f"Error creating annotated PDF: {str(e)}", exc_info=True)
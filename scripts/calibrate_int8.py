@@ -0,0 +1,118 @@
+"""
+INT8 Calibration Script - Builds a calibrated INT8 export of the local model
+
+Samples tiles from real drawings, writes them out as a calibration dataset and
+exports the checkpoint to a TensorRT (GPU) or OpenVINO (CPU) INT8 model. The
+export is saved under the name LocalYOLODetector looks for, so it is picked up
+automatically on the next start.
+
+Usage:
+    python scripts/calibrate_int8.py drawings/*.pdf --format openvino --tiles 400
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+from modules.pdf_processor import PDFProcessor  # noqa: E402
+from modules.local_yolo_detector import export_target_path  # noqa: E402
+
+logging.basicConfig(level=config.LOG_LEVEL, format=config.LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+
+def collect_tiles(pdf_paths, tile_count, seed=0):
+    """
+    Sample non-blank tiles across the given PDFs
+
+    Returns:
+        List of PIL Image tiles
+    """
+    processor = PDFProcessor(dpi=config.DPI)
+    tiles = []
+    for pdf_path in pdf_paths:
+        for page in processor.pdf_to_images(pdf_path):
+            page_tiles, _ = processor.create_tiles(page, skip_blank=True, prioritize_complex=False)
+            tiles.extend(tile['image'] for tile in page_tiles)
+        logger.info(f"Collected {len(tiles)} tiles after {os.path.basename(pdf_path)}")
+
+    random.Random(seed).shuffle(tiles)
+    return tiles[:tile_count]
+
+
+def write_dataset(tiles, dataset_dir, class_names):
+    """
+    Write tiles as an unlabeled image dataset and return its data YAML path
+
+    Calibration only needs activations, so no label files are written.
+    """
+    image_dir = os.path.join(dataset_dir, 'images')
+    os.makedirs(image_dir, exist_ok=True)
+    for index, tile in enumerate(tiles):
+        tile.save(os.path.join(image_dir, f'tile_{index:05d}.png'))
+
+    yaml_path = os.path.join(dataset_dir, 'calib.yaml')
+    with open(yaml_path, 'w', encoding='utf-8') as f:
+        f.write(f"path: {dataset_dir}\n")
+        f.write("train: images\n")
+        f.write("val: images\n")
+        f.write("names:\n")
+        for class_id, name in sorted(class_names.items()):
+            f.write(f"  {class_id}: {name}\n")
+    return yaml_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pdfs', nargs='+', help='Representative fire alarm drawings')
+    parser.add_argument('--model', default=config.LOCAL_MODEL_PATH, help='Checkpoint to export')
+    parser.add_argument('--format', choices=['engine', 'openvino'], default=None,
+                        help='engine (TensorRT, GPU) or openvino (CPU); defaults by CUDA availability')
+    parser.add_argument('--tiles', type=int, default=400, help='Number of calibration tiles')
+    args = parser.parse_args()
+
+    import torch
+    from ultralytics import YOLO
+
+    export_format = args.format or ('engine' if torch.cuda.is_available() else 'openvino')
+    target_path = export_target_path(args.model, export_format, 'int8')
+
+    tiles = collect_tiles(args.pdfs, args.tiles)
+    if not tiles:
+        logger.error("No usable tiles found in the given PDFs")
+        return 1
+
+    model = YOLO(args.model)
+    dataset_dir = tempfile.mkdtemp(prefix='int8_calib_')
+    try:
+        data_yaml = write_dataset(tiles, dataset_dir, model.names)
+        logger.info(f"Calibrating {export_format} INT8 export on {len(tiles)} tiles...")
+        exported_path = model.export(
+            format=export_format,
+            int8=True,
+            data=data_yaml,
+            imgsz=config.TILE_SIZE,
+            batch=config.TILE_BATCH_SIZE,
+            dynamic=True,
+            device=0 if export_format == 'engine' else 'cpu',
+        )
+        if os.path.isdir(target_path):
+            shutil.rmtree(target_path)
+        elif os.path.exists(target_path):
+            os.remove(target_path)
+        shutil.move(str(exported_path), target_path)
+    finally:
+        shutil.rmtree(dataset_dir, ignore_errors=True)
+
+    logger.info(f"✅ INT8 model saved to {target_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
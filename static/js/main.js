@@ -337,7 +337,7 @@ function generatePagePreviews(file) {
                 const pageThumb = document.createElement('div');
                 pageThumb.className = 'page-thumb';
                 pageThumb.innerHTML = `
-                    <img src="${page.thumbnail}" alt="Page ${page.page_number}">
+                    <img src="${page.url}" loading="lazy" alt="Page ${page.page_number}">
                     <div class="page-number">Page ${page.page_number}</div>
                 `;
                 pageThumb.onclick = () => {
@@ -426,7 +426,7 @@ function startAnalysis(type) {
             analyzeBtn.disabled = true;
         }
 
-        endpoint = '/api/analyze';
+        endpoint = '/api/analyze_stream';
     } else {
         if (startGeminiBtn) {
             startGeminiBtn.disabled = true;
@@ -442,11 +442,13 @@ function startAnalysis(type) {
         endpoint = '/api/analyze_gemini';
     }
 
+    const totalSelected = type === 'local' ? formData.get('selected_pages').split(',').length : 0;
+
     fetch(endpoint, {
         method: 'POST',
         body: formData,
     })
-        .then((response) => response.json())
+        .then((response) => (type === 'local' ? readAnalysisStream(response, totalSelected) : response.json()))
         .then((data) => {
             if (!data.success) {
                 throw new Error(data.error || 'Analysis failed');
@@ -480,6 +482,57 @@ function startAnalysis(type) {
         });
 }
 
+async function readAnalysisStream(response, totalPages) {
+    // The local endpoint streams NDJSON: one "page" line per finished page,
+    // then a "done" line with the full summary. Validation errors come back
+    // as a single plain JSON object, which is handled the same way.
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let pagesDone = 0;
+
+    const handleLine = (line) => {
+        if (!line.trim()) {
+            return null;
+        }
+        const message = JSON.parse(line);
+        if (message.type !== 'page') {
+            return message;
+        }
+        pagesDone += 1;
+        if (progressFill && progressText) {
+            const percent = totalPages ? Math.min(99, Math.round((pagesDone / totalPages) * 100)) : 0;
+            const devices = (message.page.devices || []).length;
+            progressFill.style.width = `${percent}%`;
+            progressText.textContent = `Analyzed page ${message.page.page_number} (${pagesDone}/${totalPages || '?'}) - ${devices} devices`;
+        }
+        return null;
+    };
+
+    while (true) {
+        const { value, done } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+
+        let newline = buffer.indexOf('\n');
+        while (newline !== -1) {
+            const result = handleLine(buffer.slice(0, newline));
+            buffer = buffer.slice(newline + 1);
+            if (result) {
+                return result;
+            }
+            newline = buffer.indexOf('\n');
+        }
+
+        if (done) {
+            const result = handleLine(buffer);
+            if (result) {
+                return result;
+            }
+            throw new Error('Analysis stream ended unexpectedly');
+        }
+    }
+}
+
 function displayDetectionResults(data) {
     currentJobId = data.job_id || null;
 